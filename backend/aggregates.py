@@ -0,0 +1,139 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db, job_queue, response_cache
+from models import BookingStatus
+from ranking import refresh_scores, touch_recency
+from ratings import apply_rating_deltas
+from stats import apply_booking_changes, earned
+
+# Everything derived from a provider's bookings and reviews: the rating
+# aggregates, the ranking score and the dashboard's daily rollups. Writes
+# describe what they changed in a refresh_provider job; the job queue folds
+# the jobs for one provider together and applies the sum with SQL-side
+# increments after the write commits. A request pays for its own rows only
+# and a job for the deltas it carries, however long the provider's history.
+#
+# A payload looks like
+#
+#   {'reviews': {'count': 1, 'sum': 4, 'stars': {'4': 1}},
+#    'days': {'2026-03-01': {'pending': -1, 'completed': 1, 'earnings': '250.00'}},
+#    'active_at': '2026-03-01T12:00:00'}
+#
+# (JSON, so star keys are strings and earnings a decimal string).
+
+REFRESH_PROVIDER = 'refresh_provider'
+
+
+def merge_deltas(a, b):
+    """Fold two payloads into one: counts and earnings add, active_at keeps the latest."""
+    merged = dict(a)
+    for key, value in b.items():
+        if key not in merged:
+            merged[key] = value
+        elif key == 'active_at':
+            merged[key] = max(merged[key], value)
+        elif key == 'earnings':
+            merged[key] = str(Decimal(merged[key]) + Decimal(value))
+        elif isinstance(value, dict):
+            merged[key] = merge_deltas(merged[key], value)
+        else:
+            merged[key] += value
+    return merged
+
+
+def provider_changed(provider_id, delta):
+    """Queue ``delta`` for ``provider_id``'s aggregates once the current transaction commits."""
+    job_queue.enqueue(REFRESH_PROVIDER, provider_id, delta)
+    db.session.info.setdefault('changed_providers', set()).add(provider_id)
+
+
+def review_changed(provider_id, added=None, removed=None):
+    """A verified review's rating was ``added`` and/or ``removed`` (an edit is both)."""
+    if added == removed:
+        return
+    stars = {}
+    for star, step in ((added, 1), (removed, -1)):
+        if star is not None:
+            stars[str(star)] = stars.get(str(star), 0) + step
+    delta = {'reviews': {
+        'count': (added is not None) - (removed is not None),
+        'sum': (added or 0) - (removed or 0),
+        'stars': stars,
+    }}
+    # A new review counts as activity for the ranking's recency boost
+    if added is not None and removed is None:
+        delta['active_at'] = datetime.utcnow().isoformat()
+    provider_changed(provider_id, delta)
+
+
+def booking_changed(provider_id, service_date, removed=None, added=None, earnings=0):
+    """A booking on ``service_date`` left status ``removed`` for ``added``
+    (either may be None), changing its earned amount by ``earnings``."""
+    day = {'earnings': str(earnings)}
+    if removed is not None:
+        day[removed.value] = -1
+    if added is not None:
+        day[added.value] = day.get(added.value, 0) + 1
+    delta = {'days': {service_date.date().isoformat(): day}}
+    # A completion counts as activity for the ranking's recency boost
+    if added == BookingStatus.COMPLETED and removed != added:
+        delta['active_at'] = datetime.utcnow().isoformat()
+    provider_changed(provider_id, delta)
+
+
+def status_changed(provider_id, service_date, old_status, new_status, old_price, new_price):
+    """booking_changed() for a status update, with the earnings it moves."""
+    booking_changed(
+        provider_id, service_date, removed=old_status, added=new_status,
+        earnings=earned(new_status, new_price) - earned(old_status, old_price)
+    )
+
+
+@job_queue.handler(REFRESH_PROVIDER, merge=merge_deltas)
+def refresh_providers(payloads):
+    apply_rating_deltas({
+        provider_id: (
+            payload['reviews']['count'],
+            payload['reviews']['sum'],
+            {int(star): step for star, step in payload['reviews']['stars'].items()},
+        )
+        for provider_id, payload in payloads.items() if 'reviews' in payload
+    })
+    apply_booking_changes([
+        {'provider_id': provider_id, 'day': date.fromisoformat(day),
+         **{column: Decimal(value) if column == 'earnings' else value for column, value in changes.items()}}
+        for provider_id, payload in payloads.items()
+        for day, changes in payload.get('days', {}).items()
+    ])
+    touch_recency({
+        provider_id: datetime.fromisoformat(payload['active_at'])
+        for provider_id, payload in payloads.items() if 'active_at' in payload
+    })
+    refresh_scores(sorted(payloads))
+    # Invalidated once the job commits. That only reaches this process's
+    # cache, so web processes stop caching a provider they changed until
+    # its job has run
+    db.session.info.setdefault('changed_providers', set()).update(payloads)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed(session):
+    # The committed write shows up right away, and the aggregates its job
+    # will update are not cached again until that job has run
+    for provider_id in session.info.pop('changed_providers', ()):
+        response_cache.invalidate(
+            'provider', provider_id,
+            pending=lambda provider_id=provider_id: job_queue.has_pending(REFRESH_PROVIDER, provider_id)
+        )
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_changed(session, previous_transaction):
+    # Unlike after_rollback, also fires when nothing had reached the
+    # database yet; a savepoint rolling back leaves the outer work staged
+    if not session.in_transaction():
+        session.info.pop('changed_providers', None)
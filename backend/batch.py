@@ -0,0 +1,37 @@
+# Helpers for the batch endpoints: "?ids=1,2,3" reads and bulk writes that
+# report a result per requested id.
+
+MAX_BATCH_SIZE = 500
+
+
+class InvalidBatch(ValueError):
+    pass
+
+
+def parse_ids(value):
+    """Parse "1,2,3" (or a JSON list) into unique ints, in request order."""
+    if isinstance(value, str):
+        value = [part for part in value.split(',') if part.strip()]
+    if not isinstance(value, list) or not value:
+        raise InvalidBatch('ids must be a non-empty list of integers')
+    try:
+        ids = list(dict.fromkeys(int(item) for item in value))
+    except (TypeError, ValueError) as e:
+        raise InvalidBatch('ids must be a non-empty list of integers') from e
+    if len(ids) > MAX_BATCH_SIZE:
+        raise InvalidBatch(f'At most {MAX_BATCH_SIZE} ids per request')
+    return ids
+
+
+def in_request_order(ids, items, key=lambda item: item.id):
+    """Return ``(found, missing)`` with ``found`` ordered like ``ids``."""
+    by_id = {key(item): item for item in items}
+    found = [by_id[item_id] for item_id in ids if item_id in by_id]
+    missing = [item_id for item_id in ids if item_id not in by_id]
+    return found, missing
+
+
+def item_result(item_id, error=None):
+    if error is None:
+        return {'id': item_id, 'ok': True}
+    return {'id': item_id, 'ok': False, 'error': error}
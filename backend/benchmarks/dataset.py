@@ -0,0 +1,32 @@
+"""Synthetic benchmark dataset, bulk loaded through seed_data.BulkLoader."""
+from seed_data import load_records, synthetic_records
+
+PASSWORD = 'password123'
+
+
+class Scale:
+    def __init__(self, providers=1000, bookings=10000, reviews=20000, customers=None, seed=42):
+        self.providers = providers
+        self.bookings = bookings
+        self.reviews = reviews
+        self.customers = customers or max(providers * 4, 100)
+        # Provider-type users without a profile, for the create-profile route
+        self.spare_providers = max(providers // 10, 50)
+        self.seed = seed
+
+    def to_dict(self):
+        return {
+            'providers': self.providers,
+            'bookings': self.bookings,
+            'reviews': self.reviews,
+            'customers': self.customers,
+            'seed': self.seed,
+        }
+
+
+def load(scale, log=print):
+    records = synthetic_records(
+        scale.providers, scale.bookings, scale.reviews, scale.customers,
+        spare_providers=scale.spare_providers, password=PASSWORD, seed=scale.seed
+    )
+    return load_records(records, log=log)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Compare the ORM + to_dict() list path with the projection + FastJSONProvider path.
+
+Usage: python benchmarks/serialization.py [--providers 2000] [--per-page 50] [--rounds 200]
+
+Runs against DATABASE_URL (an in-memory SQLite database by default) and
+prints the mean time to build one /providers and one /bookings page body.
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models import (  # noqa: E402
+    db, User, UserType, ServiceCategory, ServiceProvider, Booking, BookingStatus
+)
+from loading import eager  # noqa: E402
+from projections import (  # noqa: E402
+    provider_rows, provider_row_to_dict, booking_rows, booking_row_to_dict
+)
+
+app = create_app()
+
+
+def seed(providers):
+    now = datetime(2026, 1, 1)
+    db.session.execute(db.insert(ServiceCategory), [{'name': 'Cooking', 'is_active': True}])
+    db.session.execute(db.insert(User), [
+        {
+            'name': f'User {i}', 'email': f'user{i}@example.com', 'phone': '03000000000',
+            'password_hash': '-', 'location': 'Lahore', 'created_at': now,
+            'user_type': UserType.PROVIDER if i else UserType.CUSTOMER,
+        }
+        for i in range(providers + 1)
+    ])
+    db.session.execute(db.insert(ServiceProvider), [
+        {
+            'user_id': i + 2, 'category_id': 1, 'service_title': f'Service {i}',
+            'description': 'Home cooked meals', 'specialties': ['Karahi', 'Biryani'],
+            'price_range_min': 500, 'price_range_max': 1500, 'price_unit': 'per meal',
+            'availability': {'mon_fri': '9am-5pm'}, 'service_area': 'Lahore',
+            'rating': 4.5, 'total_reviews': i % 50, 'total_bookings': i % 20,
+            'is_approved': True, 'is_active': True, 'created_at': now,
+        }
+        for i in range(providers)
+    ])
+    db.session.execute(db.insert(Booking), [
+        {
+            'customer_id': 1, 'provider_id': i % providers + 1,
+            'service_date': now + timedelta(hours=i), 'service_duration': 60,
+            'service_address': 'House 1, Lahore', 'estimated_price': 1000,
+            'final_price': 1100, 'status': BookingStatus.COMPLETED,
+            'payment_status': 'paid', 'created_at': now + timedelta(minutes=i),
+        }
+        for i in range(providers)
+    ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--providers', type=int, default=2000)
+    parser.add_argument('--per-page', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    stdlib_json = DefaultJSONProvider(app)
+    provider_order = (ServiceProvider.rating.desc(), ServiceProvider.total_reviews.desc(), ServiceProvider.id.desc())
+    booking_order = (Booking.created_at.desc(), Booking.id.desc())
+
+    def orm_providers():
+        query = ServiceProvider.query.options(*eager(ServiceProvider)).filter_by(is_approved=True, is_active=True)
+        items = query.order_by(*provider_order).limit(args.per_page).all()
+        return stdlib_json.dumps({'providers': [p.to_dict() for p in items]})
+
+    def projected_providers():
+        query = provider_rows(ServiceProvider.query.filter_by(is_approved=True, is_active=True))
+        rows = query.order_by(*provider_order).limit(args.per_page).all()
+        return app.json.dumps({'providers': [provider_row_to_dict(row) for row in rows]})
+
+    def orm_bookings():
+        query = Booking.query.options(*eager(Booking)).filter_by(customer_id=1)
+        items = query.order_by(*booking_order).limit(args.per_page).all()
+        return stdlib_json.dumps({'bookings': [b.to_dict() for b in items]})
+
+    def projected_bookings():
+        query = booking_rows(Booking.query.filter_by(customer_id=1))
+        rows = query.order_by(*booking_order).limit(args.per_page).all()
+        return app.json.dumps({'bookings': [booking_row_to_dict(row) for row in rows]})
+
+    with app.app_context():
+        db.create_all()
+        if not ServiceProvider.query.first():
+            seed(args.providers)
+
+        for name, orm_path, fast_path in (
+            ('providers', orm_providers, projected_providers),
+            ('bookings', orm_bookings, projected_bookings),
+        ):
+            results = []
+            for label, fn in (('orm + to_dict', orm_path), ('projection', fast_path)):
+                fn()  # warm up
+                db.session.expunge_all()
+                seconds = timeit.timeit(lambda: (fn(), db.session.expunge_all()), number=args.rounds)
+                results.append(seconds / args.rounds * 1000)
+                print(f'/{name:<10} {label:<14} {results[-1]:8.3f} ms/page')
+            print(f'/{name:<10} speedup        {results[0] / results[1]:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from werkzeug.http import is_resource_modified
+
+
+class ResponseCache:
+    """Bounded in-process LRU of rendered JSON responses.
+
+    Entries are keyed by ``(entity, id, version, query string)``; writes call
+    ``invalidate()`` to bump the entity's version, so stale bodies are never
+    served by this process and simply age out of the LRU. Other worker
+    processes only see the change once their entry's TTL runs out.
+    """
+
+    def __init__(self, app=None, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config.setdefault('RESPONSE_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.setdefault('RESPONSE_CACHE_TTL', self.ttl)
+
+    def _key(self, entity, entity_id, variant):
+        return (entity, entity_id, self._versions.get((entity, entity_id), 0), variant)
+
+    def get(self, entity, entity_id=None, variant=b''):
+        with self._lock:
+            key = self._key(entity, entity_id, variant)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def version(self, entity, entity_id=None):
+        with self._lock:
+            return self._versions.get((entity, entity_id), 0)
+
+    def set(self, entity, entity_id, body, etag, variant=b'', version=None):
+        with self._lock:
+            key = self._key(entity, entity_id, variant)
+            # Don't store a body rendered before a concurrent invalidate()
+            if version is not None and key[2] != version:
+                return
+            self._entries[key] = (body, etag, time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, entity, entity_id=None, pending=None):
+        """Drop the entity's cached responses.
+
+        ``pending`` is for changes still on their way, such as a queued job
+        that will update the entity: a callable returning True until they
+        have landed. Meanwhile the entity's responses are rendered fresh and
+        not stored.
+        """
+        with self._lock:
+            key = (entity, entity_id)
+            self._versions[key] = self._versions.get(key, 0) + 1
+            if pending is not None:
+                self._pending[key] = pending
+
+    def _settling(self, entity, entity_id):
+        key = (entity, entity_id)
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is None:
+            return False
+        if pending():
+            return True
+        with self._lock:
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+        return False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._pending.clear()
+
+    def cached(self, entity, id_arg=None):
+        """Serve a GET view from the cache, with a strong ETag.
+
+        ``id_arg`` names the view argument that identifies the entity.
+        Each query string (e.g. a different ``fields=``) is its own entry.
+        Only 200 responses are stored; ``If-None-Match`` is answered with a
+        304 without running the view when the entry is cached.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                entity_id = kwargs.get(id_arg) if id_arg else None
+                if self._settling(entity, entity_id):
+                    return view(*args, **kwargs)
+                variant = request.query_string
+                entry = self.get(entity, entity_id, variant)
+
+                if entry is None:
+                    version = self.version(entity, entity_id)
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    body = response.get_data()
+                    etag = hashlib.sha1(body).hexdigest()
+                    self.set(entity, entity_id, body, etag, variant, version)
+                    entry = (body, etag)
+
+                response = make_response(entry[0])
+                response.mimetype = 'application/json'
+                response.set_etag(entry[1])
+                response.headers['Cache-Control'] = 'no-cache'
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+
+def list_validators(rows, stamps, meta):
+    """``(etag, last_modified)`` for a page of projection rows.
+
+    ``stamps`` name the rows' updated_at columns, including those of the
+    rows embedded in each one. The ETag covers every row's id and stamps
+    plus the non-row part of the response (``meta``), so rows entering or
+    leaving the page change it too. Last-Modified is the newest stamp; it
+    cannot see a row leaving, so clients that send both validators are
+    answered by the ETag, as HTTP specifies.
+    """
+    versions = [(row.id, *[getattr(row, stamp) for stamp in stamps]) for row in rows]
+    etag = hashlib.sha1(repr((versions, meta)).encode()).hexdigest()
+    last_modified = max(
+        (stamp for version in versions for stamp in version[1:] if stamp is not None),
+        default=None
+    )
+    return etag, last_modified
+
+
+def conditional_list(key, rows, render, stamps, meta):
+    """Render ``{key: [render(row), ...], **meta}``, or a 304 when the
+    client's copy is current.
+
+    The validators come from the rows alone, so an unchanged page is
+    answered without rendering or encoding any of it.
+    """
+    etag, last_modified = list_validators(rows, stamps, meta)
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = jsonify({key: [render(row) for row in rows], **meta})
+    else:
+        response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
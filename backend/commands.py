@@ -0,0 +1,109 @@
+import click
+
+from extensions import db
+
+
+def register_commands(app):
+    """Attach the database maintenance commands to ``flask``."""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        # Schema work happens here rather than when the app is created
+        db.create_all()
+        click.echo("[INFO] Database tables created (if not exist).")
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        from search import rebuild_search_index
+        count = rebuild_search_index()
+        click.echo(f"[INFO] Search index rebuilt for {count} providers.")
+
+    @app.cli.command('rebuild-service-areas')
+    def rebuild_service_areas_command():
+        from sqlalchemy.orm import selectinload
+        from models import ServiceProvider
+        count = 0
+        providers = ServiceProvider.query.options(selectinload(ServiceProvider.service_areas)).all()
+        for provider in providers:
+            # Re-assigning runs the validator that rebuilds the area rows
+            provider.service_area = provider.service_area
+            count += 1
+        db.session.commit()
+        click.echo(f"[INFO] Service areas rebuilt for {count} providers.")
+
+    @app.cli.command('create-indexes')
+    def create_indexes_command():
+        # create_all() skips tables that already exist, so indexes added to the
+        # models later have to be created separately on existing databases
+        count = 0
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+                count += 1
+        click.echo(f"[INFO] Checked {count} indexes.")
+
+    @app.cli.command('install-slot-constraint')
+    def install_slot_constraint_command():
+        """Backfill booking ends and add the PostgreSQL no-overlap constraint.
+
+        The constraint needs the btree_gist extension. CREATE EXTENSION takes
+        a superuser (or a database owner on PostgreSQL 13+, where btree_gist
+        is trusted); otherwise have one run it first.
+        """
+        from scheduling import install_slot_constraint
+        with db.engine.begin() as connection:
+            count = install_slot_constraint(connection)
+        click.echo(f"[INFO] Booking slots installed ({count} booking ends backfilled).")
+
+    @app.cli.command('install-booking-versions')
+    def install_booking_versions_command():
+        from transitions import install_booking_versions
+        with db.engine.begin() as connection:
+            install_booking_versions(connection)
+        click.echo("[INFO] Booking version column installed.")
+
+    @app.cli.command('rebuild-ratings')
+    def rebuild_ratings_command():
+        from ratings import rebuild_ratings
+        count = rebuild_ratings()
+        click.echo(f"[INFO] Rating aggregates rebuilt for {count} providers.")
+
+    @app.cli.command('rebuild-booking-stats')
+    def rebuild_booking_stats_command():
+        from stats import rebuild_booking_stats
+        count = rebuild_booking_stats()
+        click.echo(f"[INFO] Booking stats rebuilt for {count} provider days.")
+
+    @app.cli.command('rebuild-geo-index')
+    def rebuild_geo_index_command():
+        from geo import rebuild_geo_index
+        count = rebuild_geo_index()
+        click.echo(f"[INFO] Geohashes rebuilt for {count} providers.")
+
+    @app.cli.command('rebuild-scores')
+    def rebuild_scores_command():
+        from ranking import rebuild_scores
+        count = rebuild_scores()
+        click.echo(f"[INFO] Ranking scores rebuilt for {count} providers.")
+
+    @app.cli.command('refresh-scores')
+    def refresh_scores_command():
+        # Run daily: decays the recency boost of providers with no new activity
+        from ranking import refresh_scores
+        refresh_scores()
+        db.session.commit()
+        click.echo("[INFO] Ranking scores refreshed.")
+
+    @app.cli.command('run-worker')
+    @click.option('--once', is_flag=True, help='Run the jobs due now, then exit.')
+    def run_worker_command(once):
+        from extensions import job_queue
+        import aggregates  # noqa: F401 - registers the job handlers
+        if job_queue.backend != 'database':
+            raise click.UsageError('run-worker needs JOB_QUEUE=database')
+        if once:
+            count = job_queue.run_pending()
+            click.echo(f"[INFO] Ran {count} jobs.")
+            return
+        click.echo("[INFO] Worker running; Ctrl+C to stop.")
+        job_queue.run_forever()
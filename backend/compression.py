@@ -0,0 +1,101 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - falls back to gzip only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain')
+
+
+def accepted_encodings(header):
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    encodings = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[coding.lower()] = quality
+    return encodings
+
+
+class Compressor:
+    """Negotiated gzip/brotli compression of response bodies.
+
+    Bodies smaller than ``COMPRESS_MIN_SIZE`` bytes are sent as-is, since
+    the encoding overhead outweighs the saving. Brotli is preferred when
+    the ``brotli`` package is installed and the client accepts it equally.
+    Compressing changes the bytes but not the representation, so strong
+    ETags are weakened; If-None-Match still matches them.
+    """
+
+    def __init__(self, app=None, min_size=1024, level=6, brotli_quality=5):
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config.setdefault('COMPRESS_MIN_SIZE', self.min_size)
+        self.level = app.config.setdefault('COMPRESS_LEVEL', self.level)
+        self.brotli_quality = app.config.setdefault('COMPRESS_BROTLI_QUALITY', self.brotli_quality)
+        if app.config.setdefault('COMPRESS_ENABLED', True):
+            app.after_request(self.compress)
+
+    def choose(self, header):
+        # Highest q-value wins; br before gzip on a tie
+        encodings = accepted_encodings(header)
+        offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+        best, best_quality = None, 0.0
+        for coding in offered:
+            quality = encodings.get(coding, encodings.get('*', 0.0))
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    def encode(self, body, accept_encoding):
+        """``(body, coding)`` for an Accept-Encoding header; coding is None
+        when the body is sent as-is."""
+        if len(body) < self.min_size:
+            return body, None
+        encoding = self.choose(accept_encoding)
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality), encoding
+        if encoding == 'gzip':
+            return gzip.compress(body, compresslevel=self.level, mtime=0), encoding
+        return body, None
+
+    def compress(self, response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body, encoding = self.encode(response.get_data(), request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -1,3 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
+from cache import ResponseCache
+from metrics import RequestMetrics
+from identity import IdentityCache
+from passwords import PasswordHasher
+from compression import Compressor
+from jobs import JobQueue
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+response_cache = ResponseCache()
+request_metrics = RequestMetrics()
+identity_cache = IdentityCache()
+password_hasher = PasswordHasher()
+compressor = Compressor()
+job_queue = JobQueue()
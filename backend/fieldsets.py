@@ -0,0 +1,198 @@
+"""Sparse fieldsets: the ``fields`` and ``expand`` query parameters.
+
+Without either parameter a response keeps its full shape, the same as the
+models' ``to_dict()``. With one of them, relations are rendered as the
+related id unless expanded, and each object renders only the fields listed
+for it (every field when none are):
+
+    GET /api/bookings/?fields=id,status,service_date
+    GET /api/bookings/?expand=provider&fields=id,status,provider.service_title
+    GET /api/services/providers?fields=id,service_title,user.name
+
+A dotted field expands the relations on its path. List endpoints select
+only the columns and joins the fieldset needs (see projections.py); detail
+endpoints only load the expanded relationships.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+from loading import eager
+from models import User, ServiceCategory, ServiceProvider, Booking, Review
+
+USER_FIELDS = (
+    'id', 'name', 'email', 'phone', 'user_type', 'location',
+    'is_verified', 'is_active', 'profile_image', 'created_at'
+)
+CATEGORY_FIELDS = ('id', 'name', 'description', 'icon', 'is_active')
+PROVIDER_FIELDS = (
+    'id', 'user_id', 'service_title', 'description', 'specialties', 'experience_years',
+    'price_range_min', 'price_range_max', 'price_unit', 'availability', 'service_area',
+    'latitude', 'longitude', 'service_radius_km', 'rating', 'total_reviews', 'total_bookings',
+    'score', 'is_approved', 'is_active', 'created_at'
+)
+BOOKING_FIELDS = (
+    'id', 'service_date', 'service_duration', 'service_address', 'latitude', 'longitude',
+    'special_requirements',
+    'estimated_price', 'final_price', 'status', 'version', 'payment_status', 'notes', 'created_at'
+)
+REVIEW_FIELDS = ('id', 'booking_id', 'provider_id', 'rating', 'comment', 'is_verified', 'created_at')
+
+
+class Relation(NamedTuple):
+    attribute: str    # relationship on the model
+    foreign_key: str  # column holding the related id
+    schema: str
+
+
+class Schema(NamedTuple):
+    model: type
+    fields: tuple
+    relations: dict = {}
+    # Falsy values to_dict() replaces, e.g. a 0 price becomes None
+    falsy: dict = {}
+
+
+SCHEMAS = {
+    'user': Schema(User, USER_FIELDS),
+    'category': Schema(ServiceCategory, CATEGORY_FIELDS),
+    'provider': Schema(
+        ServiceProvider, PROVIDER_FIELDS,
+        relations={
+            'user': Relation('user', 'user_id', 'user'),
+            'category': Relation('category', 'category_id', 'category'),
+        },
+        falsy={'price_range_min': None, 'price_range_max': None, 'rating': 0.0}
+    ),
+    'booking': Schema(
+        Booking, BOOKING_FIELDS,
+        relations={
+            'customer': Relation('customer', 'customer_id', 'user'),
+            'provider': Relation('provider', 'provider_id', 'provider'),
+        },
+        falsy={'estimated_price': None, 'final_price': None}
+    ),
+    'review': Schema(
+        Review, REVIEW_FIELDS,
+        relations={'customer': Relation('reviewer', 'customer_id', 'user')}
+    ),
+}
+
+
+class Fieldset(NamedTuple):
+    """What to render of one object: fields, and relations as
+    ``(key, Fieldset)`` pairs, where a None fieldset means "just the id"."""
+    schema: str
+    fields: tuple
+    relations: tuple = ()
+
+    @property
+    def is_full(self):
+        return self == full(self.schema)
+
+
+@lru_cache(maxsize=None)
+def full(schema_name):
+    """The to_dict() shape: every field, every relation expanded."""
+    schema = SCHEMAS[schema_name]
+    return Fieldset(schema_name, schema.fields, tuple(
+        (key, full(relation.schema)) for key, relation in schema.relations.items()
+    ))
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def _build(schema_name, path, requested, expanded, seen):
+    schema = SCHEMAS[schema_name]
+    seen.add(path)
+    names = requested.get(path)
+    for name in names or ():
+        if name not in schema.fields and name not in schema.relations:
+            raise ValueError(f"Unknown field: {'.'.join(path + (name,))}")
+
+    relations = []
+    for key, relation in schema.relations.items():
+        if path + (key,) in expanded:
+            relations.append((key, _build(relation.schema, path + (key,), requested, expanded, seen)))
+        elif names is None or key in names:
+            relations.append((key, None))
+    fields = tuple(field for field in schema.fields if names is None or field in names)
+    return Fieldset(schema_name, fields, tuple(relations))
+
+
+def parse_fieldset(args, schema_name):
+    """The Fieldset ``fields``/``expand`` in ``args`` ask for.
+
+    Raises ValueError naming the first unknown field or relation.
+    """
+    fields, expand = _names(args.get('fields')), _names(args.get('expand'))
+    if not fields and not expand:
+        return full(schema_name)
+
+    requested, expanded = {}, set()
+    for name in expand:
+        path = tuple(name.split('.'))
+        expanded.update(path[:end] for end in range(1, len(path) + 1))
+    for name in fields:
+        *path, field = name.split('.')
+        path = tuple(path)
+        requested.setdefault(path, set()).add(field)
+        expanded.update(path[:end] for end in range(1, len(path) + 1))
+
+    seen = set()
+    fieldset = _build(schema_name, (), requested, expanded, seen)
+    for path in sorted(expanded | set(requested)):
+        if path not in seen:
+            raise ValueError(f"Unknown relation: {'.'.join(path)}")
+    return fieldset
+
+
+def expanded_paths(fieldset):
+    """Dotted relationship paths ``render()`` follows."""
+    schema = SCHEMAS[fieldset.schema]
+    paths = []
+    for key, child in fieldset.relations:
+        if child is None:
+            continue
+        attribute = schema.relations[key].attribute
+        nested = expanded_paths(child)
+        if nested:
+            paths.extend(f'{attribute}.{path}' for path in nested)
+        else:
+            paths.append(attribute)
+    return paths
+
+
+def render(obj, fieldset):
+    """Render a model instance the way ``fieldset`` asks for.
+
+    Values are left for FastJSONProvider to encode, as in projections.py.
+    """
+    schema = SCHEMAS[fieldset.schema]
+    data = {field: getattr(obj, field) for field in fieldset.fields}
+    for field, default in schema.falsy.items():
+        if field in data:
+            data[field] = data[field] or default
+    for key, child in fieldset.relations:
+        relation = schema.relations[key]
+        if child is None:
+            data[key] = getattr(obj, relation.foreign_key)
+        else:
+            related = getattr(obj, relation.attribute)
+            data[key] = render(related, child) if related is not None else None
+    return data
+
+
+def load_options(fieldset):
+    # Eager load the expanded relationships only; eager() with no paths
+    # would load everything to_dict() renders
+    paths = expanded_paths(fieldset)
+    return eager(SCHEMAS[fieldset.schema].model, *paths) if paths else []
+
+
+def to_dict(obj, fieldset, **kwargs):
+    """``obj.to_dict(**kwargs)`` for the full fieldset, else ``render()``."""
+    if fieldset.is_full:
+        return obj.to_dict(**kwargs)
+    return render(obj, fieldset)
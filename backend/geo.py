@@ -0,0 +1,239 @@
+"""Nearest-provider search over a geohash index.
+
+Providers with coordinates carry a geohash of their position, indexed as a
+plain string. A search for providers within ``radius_km`` of a point picks
+the geohash precision whose cells are at least ``radius_km`` across; the
+circle then fits inside the 3x3 block of cells around the point, and each
+cell is one index range scan (``geohash >= cell AND geohash < next cell``).
+Distances to those candidates are computed, filtered, ordered and paged in
+SQL, so a request only loads the rows on its page.
+
+This runs unchanged on SQLite and PostgreSQL; PostGIS is not required.
+"""
+import math
+
+from sqlalchemy import and_, case, event, or_
+
+from models import db, ServiceProvider, Booking, add_missing_columns
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+GEOHASH_PRECISION = 9  # about 5m x 5m, finer than any search needs
+MAX_RADIUS_KM = 200
+DEFAULT_RADIUS_KM = 10
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def parse_coordinates(latitude, longitude):
+    """Validate a latitude/longitude pair; both None means "no location"."""
+    if latitude is None and longitude is None:
+        return None, None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError('latitude and longitude must both be numbers')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Coordinates out of range')
+    return latitude, longitude
+
+
+def parse_radius(value):
+    # A provider's travel radius in km; None means no limit
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('service_radius_km must be a number')
+    if value <= 0:
+        raise ValueError('service_radius_km must be positive')
+    return value
+
+
+def parse_point(value):
+    # "31.52,74.35" -> (31.52, 74.35)
+    parts = value.split(',')
+    if len(parts) != 2:
+        raise ValueError('near must be "lat,lng"')
+    return parse_coordinates(*parts)
+
+
+def parse_near(args):
+    """``(latitude, longitude, radius_km)`` from ``near``/``radius_km``, or None."""
+    if not args.get('near'):
+        return None
+    latitude, longitude = parse_point(args['near'])
+    radius_km = args.get('radius_km', DEFAULT_RADIUS_KM, type=float)
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValueError(f'radius_km must be between 0 and {MAX_RADIUS_KM}')
+    return latitude, longitude, radius_km
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        # Bits alternate between longitude and latitude, longitude first
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    # Haversine great-circle distance
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Geohash prefixes whose cells together contain the search circle.
+
+    Returns an empty list when the circle is too large (or too close to a
+    pole) for any cell block to bound it, meaning "no index restriction".
+    """
+    # Longitude degrees shrink towards the poles; size cells for the
+    # narrowest latitude the circle reaches
+    widest_lat = min(90.0, abs(latitude) + radius_km / KM_PER_DEGREE)
+    km_per_lng_degree = KM_PER_DEGREE * math.cos(math.radians(widest_lat))
+
+    precision = 0
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        height, width = cell_size(candidate)
+        if height * KM_PER_DEGREE < radius_km or width * km_per_lng_degree < radius_km:
+            break
+        precision = candidate
+    if precision == 0:
+        return []
+
+    height, width = cell_size(precision)
+    cells = set()
+    for d_lat in (-height, 0, height):
+        for d_lng in (-width, 0, width):
+            lat = latitude + d_lat
+            if not -90 <= lat <= 90:
+                continue
+            lng = (longitude + d_lng + 180) % 360 - 180
+            cells.add(encode(lat, lng, precision))
+    return sorted(cells)
+
+
+def _next_cell(cell):
+    # The first geohash after every one starting with ``cell``; alphanumeric,
+    # so the range holds under any collation. None past the last cell.
+    cell = cell.rstrip(_BASE32[-1])
+    if not cell:
+        return None
+    return cell[:-1] + _BASE32[_BASE32.index(cell[-1]) + 1]
+
+
+def near_filter(column, cells):
+    """Restrict ``column`` (a geohash) to the given cells, one range per cell."""
+    ranges = []
+    for cell in cells:
+        end = _next_cell(cell)
+        ranges.append(and_(column >= cell, column < end) if end else column >= cell)
+    return or_(*ranges)
+
+
+def squared_distance(latitude, longitude):
+    """Squared km from the point to a provider, as SQL arithmetic.
+
+    A flat-earth approximation scaled by the cosine of the mean latitude
+    (to first order around the point), so it needs no SQL trig functions.
+    Within MAX_RADIUS_KM it stays within 0.1% of the great-circle distance.
+    """
+    d_lat = ServiceProvider.latitude - latitude
+    d_lng = ServiceProvider.longitude - longitude
+    d_lng = case((d_lng > 180, d_lng - 360), (d_lng < -180, d_lng + 360), else_=d_lng)
+    phi = math.radians(latitude)
+    cos_mean = math.cos(phi) - math.sin(phi) * math.pi / 360 * d_lat
+    north = d_lat * KM_PER_DEGREE
+    east = d_lng * KM_PER_DEGREE * cos_mean
+    return north * north + east * east
+
+
+def near_query(query, latitude, longitude, radius_km):
+    """Narrow a ServiceProvider query or select() to providers near the point.
+
+    Keeps providers within ``radius_km`` of the point whose own service
+    radius (when set) also reaches it. Returns the query and the squared
+    distance expression, for ordering nearest first.
+    """
+    distance = squared_distance(latitude, longitude)
+    query = query.filter(ServiceProvider.geohash.isnot(None))
+    cells = covering_cells(latitude, longitude, radius_km)
+    if cells:
+        query = query.filter(near_filter(ServiceProvider.geohash, cells))
+    query = query.filter(
+        distance <= radius_km * radius_km,
+        or_(ServiceProvider.service_radius_km.is_(None),
+            distance <= ServiceProvider.service_radius_km * ServiceProvider.service_radius_km)
+    )
+    return query, distance
+
+
+def _geohash_for(target, latitude, longitude):
+    target.geohash = encode(latitude, longitude) if latitude is not None and longitude is not None else None
+
+
+@event.listens_for(ServiceProvider.latitude, 'set')
+def _keep_geohash_on_latitude(target, value, oldvalue, initiator):
+    _geohash_for(target, value, target.longitude)
+
+
+@event.listens_for(ServiceProvider.longitude, 'set')
+def _keep_geohash_on_longitude(target, value, oldvalue, initiator):
+    _geohash_for(target, target.latitude, value)
+
+
+# Columns added after the first release, for databases created before them
+_ADDED_COLUMNS = {
+    ServiceProvider.__table__: ('latitude', 'longitude', 'service_radius_km', 'geohash'),
+    Booking.__table__: ('latitude', 'longitude'),
+}
+
+
+def rebuild_geo_index():
+    """Add any missing location columns, then recompute every geohash."""
+    connection = db.session.connection()
+    for table, names in _ADDED_COLUMNS.items():
+        add_missing_columns(connection, table, names)
+    for index in ServiceProvider.__table__.indexes:
+        if index.name == 'ix_service_providers_geohash':
+            index.create(connection, checkfirst=True)
+
+    rows = connection.execute(
+        db.select(ServiceProvider.id, ServiceProvider.latitude, ServiceProvider.longitude)
+        .where(ServiceProvider.latitude.isnot(None), ServiceProvider.longitude.isnot(None))
+    ).all()
+    connection.execute(db.update(ServiceProvider).values(geohash=None))
+    if rows:
+        connection.execute(
+            db.update(ServiceProvider.__table__)
+            .where(ServiceProvider.__table__.c.id == db.bindparam('provider_id'))
+            .values(geohash=db.bindparam('hash')),
+            [{'provider_id': provider_id, 'hash': encode(lat, lng)} for provider_id, lat, lng in rows]
+        )
+    db.session.commit()
+    return len(rows)
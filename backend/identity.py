@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import jsonify
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# What authorisation needs to know about the caller. Handlers that render or
+# change the user still load the full row.
+Identity = namedtuple('Identity', 'id user_type is_active provider_id')
+
+# User attributes an Identity is built from
+IDENTITY_FIELDS = ('user_type', 'is_active')
+
+
+class IdentityCache:
+    """Bounded TTL/LRU of the JWT caller's Identity, keyed by user id.
+
+    Registered as flask-jwt-extended's ``user_lookup_loader``, so
+    ``current_user`` inside a protected view is an Identity and a cached
+    caller costs no query. Changes to the cached fields are picked up by a
+    session hook after commit; views may also call ``invalidate()``.
+    Other worker processes only see a change once their entry expires.
+    """
+
+    def __init__(self, app=None, jwt=None, max_entries=4096, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, jwt)
+
+    def init_app(self, app, jwt):
+        self.max_entries = app.config.setdefault('IDENTITY_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.setdefault('IDENTITY_CACHE_TTL', self.ttl)
+
+        # PyJWT only accepts string subjects; views get the int id from
+        # current_user instead of get_jwt_identity()
+        jwt.user_identity_loader(lambda user_id: str(user_id))
+        jwt.user_lookup_loader(self._lookup)
+        jwt.user_lookup_error_loader(
+            lambda jwt_header, jwt_data: (jsonify({'error': 'User not found or deactivated'}), 401)
+        )
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[0]
+
+    def load(self, user_id):
+        with self._lock:
+            version = self._versions.get(user_id, 0)
+
+        identity = _load_identity(user_id)
+
+        with self._lock:
+            # Don't store a row read before a concurrent invalidate()
+            if identity is not None and self._versions.get(user_id, 0) == version:
+                self._entries[user_id] = (identity, time.monotonic() + self.ttl)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return identity
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def _lookup(self, jwt_header, jwt_data):
+        try:
+            user_id = int(jwt_data['sub'])
+        except (TypeError, ValueError):
+            return None
+        identity = self.get(user_id) or self.load(user_id)
+        # Deactivated users lose access as soon as their entry is invalidated
+        if identity is None or not identity.is_active:
+            return None
+        return identity
+
+
+def _load_identity(user_id):
+    from extensions import db
+    from models import User, ServiceProvider
+
+    row = (
+        db.session.query(User.id, User.user_type, User.is_active, ServiceProvider.id)
+        .outerjoin(ServiceProvider, ServiceProvider.user_id == User.id)
+        .filter(User.id == user_id)
+        .first()
+    )
+    return Identity(*row) if row else None
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_identity_changes(session, flush_context):
+    from models import User, ServiceProvider
+
+    changed = session.info.setdefault('identity_changes', set())
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in IDENTITY_FIELDS):
+                changed.add(obj.id)
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, ServiceProvider):
+            changed.add(obj.user_id)
+        elif isinstance(obj, User):
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_identities(session):
+    from extensions import identity_cache
+
+    for user_id in session.info.pop('identity_changes', ()):
+        identity_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_identity_changes(session):
+    session.info.pop('identity_changes', None)
@@ -0,0 +1,255 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.orm import Session
+
+BACKENDS = ('database', 'memory')
+
+
+class JobQueue:
+    """Background jobs for follow-up work, run after the change that needs them commits.
+
+    Views call ``enqueue(kind, provider_id, payload)`` before committing.
+    The job is staged on the session and only queued if that transaction
+    commits.
+
+    ``database`` mode inserts the job row as part of that commit. Worker
+    processes (``flask run-worker``) claim batches with SELECT ... FOR
+    UPDATE SKIP LOCKED, so any number of them can run side by side.
+
+    ``memory`` mode queues jobs in-process and runs them at the end of the
+    request, for tests and single-process development.
+
+    A job carries a JSON payload describing what changed. Jobs of one kind
+    for the same provider are folded together with the kind's ``merge``
+    function, both when staged in one transaction and when a worker claims a
+    batch, so a burst of writes to one provider costs a single handler run.
+    """
+
+    def __init__(self, app=None, backend='database', batch_size=100, max_attempts=5, poll_interval=1.0,
+                 retry_delay=5):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self._handlers = {}
+        self._memory = deque()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = app.config.setdefault('JOB_QUEUE', self.backend)
+        if self.backend not in BACKENDS:
+            raise ValueError(f"JOB_QUEUE must be one of {', '.join(BACKENDS)}")
+        self.batch_size = app.config.setdefault('JOB_BATCH_SIZE', self.batch_size)
+        self.max_attempts = app.config.setdefault('JOB_MAX_ATTEMPTS', self.max_attempts)
+        self.poll_interval = app.config.setdefault('JOB_POLL_INTERVAL', self.poll_interval)
+        self.retry_delay = app.config.setdefault('JOB_RETRY_DELAY', self.retry_delay)
+        if self.backend == 'memory':
+            app.teardown_request(self._run_after_request)
+
+    def handler(self, kind, merge):
+        """Register ``func(payloads)`` to run jobs of ``kind``.
+
+        ``payloads`` maps each provider id in the batch to its jobs' payloads
+        folded together with ``merge(a, b)``.
+        """
+        def decorator(func):
+            self._handlers[kind] = (func, merge)
+            return func
+        return decorator
+
+    def enqueue(self, kind, provider_id, payload):
+        from extensions import db
+        session = db.session()
+        if not session.in_transaction():
+            # So a rollback before anything is flushed still discards the job
+            session.begin()
+        staged = session.info.setdefault('staged_jobs', {})
+        key = (kind, provider_id)
+        staged[key] = self._handlers[kind][1](staged[key], payload) if key in staged else payload
+
+    def has_pending(self, kind, provider_id):
+        """Whether a job of ``kind`` for ``provider_id`` is still waiting to run."""
+        if self.backend == 'memory':
+            with self._lock:
+                return any(job[:2] == (kind, provider_id) for job in self._memory)
+
+        from extensions import db
+        from models import Job
+        return db.session.query(
+            db.select(Job.id)
+            .where(Job.kind == kind, Job.provider_id == provider_id, Job.failed_at.is_(None))
+            .exists()
+        ).scalar()
+
+    def _fold(self, kind, jobs):
+        # (provider_id, payload) pairs -> {provider_id: merged payload}
+        merge = self._handlers[kind][1]
+        payloads = {}
+        for provider_id, payload in jobs:
+            payloads[provider_id] = merge(payloads[provider_id], payload) if provider_id in payloads else payload
+        return payloads
+
+    def _push(self, jobs):
+        with self._lock:
+            self._memory.extend(jobs)
+
+    def work(self):
+        """Run at most one batch of each kind of job; returns the jobs done."""
+        if self.backend == 'memory':
+            return self._work_memory()
+        return sum(self._work_database(kind) for kind in list(self._handlers))
+
+    def run_pending(self):
+        """Work until nothing is due, e.g. ``flask run-worker --once`` or in tests."""
+        total = 0
+        while True:
+            done = self.work()
+            if not done:
+                return total
+            total += done
+
+    def run_forever(self):
+        while True:
+            if not self.work():
+                time.sleep(self.poll_interval)
+
+    def _work_memory(self):
+        from extensions import db
+
+        with self._lock:
+            jobs = [self._memory.popleft() for _ in range(min(self.batch_size, len(self._memory)))]
+        by_kind = {}
+        for kind, provider_id, payload in jobs:
+            by_kind.setdefault(kind, []).append((provider_id, payload))
+        for kind, kind_jobs in by_kind.items():
+            self._handlers[kind][0](self._fold(kind, kind_jobs))
+            db.session.commit()
+        return len(jobs)
+
+    def _claim(self, kind, *criteria, limit=None):
+        from extensions import db
+        from models import Job
+
+        query = (
+            select(Job.id, Job.provider_id, Job.payload)
+            .where(Job.kind == kind, Job.failed_at.is_(None), *criteria)
+            .order_by(Job.run_at, Job.id)
+            .with_for_update(skip_locked=True)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return db.session.execute(query).all()
+
+    def _run_claimed(self, kind, claimed):
+        # The handler's writes and the jobs' deletion commit together, so each
+        # job is folded in exactly once
+        from extensions import db
+        from models import Job
+
+        self._handlers[kind][0](self._fold(kind, [(job.provider_id, job.payload) for job in claimed]))
+        db.session.execute(delete(Job).where(Job.id.in_([job.id for job in claimed])))
+        db.session.commit()
+
+    def _work_database(self, kind):
+        from extensions import db
+        from models import Job
+
+        claimed = self._claim(kind, Job.run_at <= datetime.utcnow(), limit=self.batch_size)
+        if not claimed:
+            db.session.rollback()
+            return 0
+
+        by_provider = {}
+        for job in claimed:
+            by_provider.setdefault(job.provider_id, []).append(job.id)
+        try:
+            self._run_claimed(kind, claimed)
+        except Exception as e:
+            db.session.rollback()
+            if len(by_provider) == 1:
+                current_app.logger.exception('Job %s failed for provider %s', kind, claimed[0].provider_id)
+                self._retry_later([job.id for job in claimed], e)
+                return len(claimed)
+            # Retry each provider on its own, so one bad job only holds back
+            # its own provider's
+            for provider_id, job_ids in by_provider.items():
+                self._work_provider(kind, provider_id, job_ids)
+        return len(claimed)
+
+    def _work_provider(self, kind, provider_id, job_ids):
+        from extensions import db
+        from models import Job
+
+        # Re-claimed, since the failed batch's rollback released the locks
+        claimed = self._claim(kind, Job.id.in_(job_ids))
+        if not claimed:
+            db.session.rollback()
+            return
+        try:
+            self._run_claimed(kind, claimed)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception('Job %s failed for provider %s', kind, provider_id)
+            self._retry_later([job.id for job in claimed], e)
+
+    def _retry_later(self, job_ids, error):
+        # Exponential backoff; after max_attempts the job is kept but parked
+        from extensions import db
+        from models import Job
+
+        now = datetime.utcnow()
+        params = []
+        for job_id, attempts in db.session.execute(select(Job.id, Job.attempts).where(Job.id.in_(job_ids))).all():
+            attempts += 1
+            params.append({
+                'id': job_id,
+                'attempts': attempts,
+                'run_at': now + timedelta(seconds=self.retry_delay * 2 ** (attempts - 1)),
+                'last_error': str(error),
+                'failed_at': now if attempts >= self.max_attempts else None,
+            })
+        if params:
+            db.session.execute(update(Job), params)
+        db.session.commit()
+
+    def _run_after_request(self, exc):
+        if exc is None:
+            self.run_pending()
+
+
+@event.listens_for(Session, 'before_commit')
+def _insert_staged_jobs(session):
+    from extensions import job_queue
+    from models import Job
+
+    if job_queue.backend == 'database' and session.info.get('staged_jobs'):
+        staged = session.info.pop('staged_jobs')
+        session.execute(insert(Job), [
+            {'kind': kind, 'provider_id': provider_id, 'payload': payload}
+            for (kind, provider_id), payload in sorted(staged.items())
+        ])
+
+
+@event.listens_for(Session, 'after_commit')
+def _queue_staged_jobs(session):
+    from extensions import job_queue
+
+    staged = session.info.pop('staged_jobs', None)
+    if staged:
+        job_queue._push([(kind, provider_id, payload) for (kind, provider_id), payload in sorted(staged.items())])
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_staged_jobs(session, previous_transaction):
+    # Unlike after_rollback, also fires when nothing had reached the
+    # database yet; a savepoint rolling back leaves the outer work staged
+    if not session.in_transaction():
+        session.info.pop('staged_jobs', None)
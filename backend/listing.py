@@ -0,0 +1,123 @@
+from sqlalchemy import String, case, cast, func, literal, union_all
+
+from extensions import db
+from models import ServiceProvider, ProviderServiceArea, Review, parse_service_areas
+from geo import near_query
+from search import search_providers
+
+# Query building shared by the Flask blueprints and the async read app
+# (asgi.py). Everything here works on both a legacy ``Query`` and a 2.0
+# ``select()``, and request arguments come in as a werkzeug MultiDict.
+
+# Served by ix_service_providers_listing(_all); see ranking.py for the score
+PROVIDER_ORDER = (ServiceProvider.score, ServiceProvider.id)
+REVIEW_ORDER = (Review.created_at, Review.id)
+
+
+FACETS = ('category', 'location', 'rating')
+FACET_LIMIT = 50
+# Rating facet values are min_rating thresholds
+RATING_THRESHOLDS = (4, 3, 2, 1)
+
+
+def provider_filters(query, args, skip=None):
+    """Apply the category, location and rating filters of a provider list.
+
+    ``skip`` names one facet whose filter is left out, for counting the
+    other values of that facet.
+    """
+    category_id = args.get('category_id', type=int) if skip != 'category' else None
+    location = args.get('location') if skip != 'location' else None
+    min_rating = args.get('min_rating', type=float) if skip != 'rating' else None
+
+    if category_id:
+        query = query.filter_by(category_id=category_id)
+
+    if location:
+        # Exact match on the indexed area rows; "Lahore,Karachi" matches either
+        areas = parse_service_areas(location)
+        query = query.filter(ServiceProvider.id.in_(
+            db.select(ProviderServiceArea.provider_id).where(ProviderServiceArea.area.in_(areas))
+        ))
+
+    if min_rating:
+        query = query.filter(ServiceProvider.rating >= min_rating)
+
+    return query
+
+
+def parse_facets(value):
+    facets = [facet.strip() for facet in value.split(',') if facet.strip()]
+    unknown = [facet for facet in facets if facet not in FACETS]
+    if unknown:
+        raise ValueError(f"Unknown facet: {unknown[0]}")
+    return list(dict.fromkeys(facets))
+
+
+def _rating_bucket(rating):
+    return case(*[(rating >= threshold, threshold) for threshold in RATING_THRESHOLDS], else_=0)
+
+
+def facet_query(args, facets, dialect=None, near=None):
+    """Count providers per value of each facet in one UNION ALL statement.
+
+    Each facet is counted under every filter except its own, so the counts
+    say how many providers each option would show. ``near`` is parse_near()'s
+    result, restricting the counts to a nearby search. Only the
+    ``FACET_LIMIT`` largest values of a facet are returned.
+    """
+    search = args.get('search')
+    parts = []
+    for facet in facets:
+        matching = provider_filters(
+            db.select(ServiceProvider.id, ServiceProvider.category_id, ServiceProvider.rating)
+            .filter_by(is_approved=True, is_active=True),
+            args,
+            skip=facet
+        )
+        if search:
+            matching, _ = search_providers(matching, search, dialect=dialect)
+        if near:
+            matching, _ = near_query(matching, *near)
+        matching = matching.subquery()
+
+        if facet == 'category':
+            value, counted = matching.c.category_id, db.select(matching)
+        elif facet == 'location':
+            value = ProviderServiceArea.area
+            counted = db.select(matching).join(ProviderServiceArea, ProviderServiceArea.provider_id == matching.c.id)
+        else:
+            value, counted = _rating_bucket(matching.c.rating), db.select(matching)
+
+        count = func.count().label('count')
+        part = counted.with_only_columns(
+            literal(facet).label('facet'), cast(value, String).label('value'), count
+        ).group_by(value).order_by(count.desc()).limit(FACET_LIMIT).subquery()
+        parts.append(db.select(*part.c))
+
+    return union_all(*parts)
+
+
+def facet_counts(rows, facets):
+    """Shape ``facet_query`` rows as ``{facet: [{'value', 'count'}, ...]}``."""
+    counts = {facet: {} for facet in facets}
+    for facet, value, count in rows:
+        counts[facet][value] = count
+
+    result = {}
+    for facet in facets:
+        if facet == 'rating':
+            # Buckets hold providers rated in [threshold, next threshold);
+            # a min_rating filter matches every bucket at or above it
+            buckets = {int(value): count for value, count in counts[facet].items()}
+            result[facet] = [
+                {'value': threshold, 'count': sum(n for bucket, n in buckets.items() if bucket >= threshold)}
+                for threshold in RATING_THRESHOLDS
+            ]
+        else:
+            values = sorted(counts[facet].items(), key=lambda item: (-item[1], item[0]))
+            result[facet] = [
+                {'value': int(value) if facet == 'category' else value, 'count': count}
+                for value, count in values
+            ]
+    return result
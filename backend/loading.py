@@ -0,0 +1,38 @@
+from sqlalchemy.orm import configure_mappers, joinedload, selectinload
+from models import ServiceProvider, Booking, Review
+
+# Relationships each model's to_dict() renders, as dotted attribute paths.
+# Keep these in step with the serializers in models.py, otherwise the
+# missing relationship is lazy loaded once per row again.
+RENDERED_RELATIONSHIPS = {
+    ServiceProvider: ('user', 'category'),
+    Booking: ('customer', 'provider.user', 'provider.category'),
+    Review: ('reviewer',),
+}
+
+
+def _loader(parent, attr):
+    # Many-to-one rows ride along in the same SELECT; collections would
+    # multiply the rows under LIMIT, so they get one extra IN query instead
+    strategy = selectinload if attr.property.uselist else joinedload
+    return strategy(attr) if parent is None else getattr(parent, strategy.__name__)(attr)
+
+
+def eager(model, *paths):
+    """Loader options that fetch the given relationship paths up front.
+
+    With no paths, everything ``model.to_dict()`` renders is loaded, so a
+    page of rows is serialized in a constant number of queries.
+    """
+    # Backref attributes only exist once the mappers are configured
+    configure_mappers()
+
+    options = []
+    for path in paths or RENDERED_RELATIONSHIPS.get(model, ()):
+        current, loader = model, None
+        for name in path.split('.'):
+            attr = getattr(current, name)
+            loader = _loader(loader, attr)
+            current = attr.property.mapper.class_
+        options.append(loader)
+    return options
@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import Counter
+
+from flask import Response, g, has_request_context, request, request_finished, request_started
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        else:
+            series[-2] += 1
+        series[-1] += value
+
+    def render(self, label_names):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self._series.items()):
+            label_text = ','.join(f'{name}="{value}"' for name, value in zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            cumulative += series[-2]
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+class RequestMetrics:
+    """Per-request SQL and timing instrumentation, exported for Prometheus.
+
+    SQLAlchemy cursor events count statements and DB time for the request
+    running on the current thread; Flask's request signals open and close
+    the measurement. Aggregates are served at ``/api/metrics``.
+    """
+
+    LABELS = ('endpoint', 'method')
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._requests = Counter()
+        self._histograms = {
+            'duration': Histogram(
+                'http_request_duration_seconds', 'Total time spent handling the request.', LATENCY_BUCKETS
+            ),
+            'db_time': Histogram(
+                'http_request_db_seconds', 'Time spent executing SQL during the request.', LATENCY_BUCKETS
+            ),
+            'queries': Histogram(
+                'http_request_queries', 'SQL statements executed during the request.', QUERY_BUCKETS
+            ),
+            'size': Histogram(
+                'http_response_size_bytes', 'Size of the response body.', SIZE_BUCKETS
+            ),
+        }
+        self.repeat_threshold = 10
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_REPEATED_STATEMENT_THRESHOLD', self.repeat_threshold)
+        if not app.config['METRICS_ENABLED']:
+            return
+        self.repeat_threshold = app.config['METRICS_REPEATED_STATEMENT_THRESHOLD']
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        request_started.connect(self._request_started, app)
+        request_finished.connect(self._request_finished, app)
+        app.add_url_rule('/api/metrics', 'metrics', self.export)
+
+    def _request_started(self, sender, **extra):
+        g._sql_metrics = {'started': time.perf_counter(), 'queries': 0, 'db_time': 0.0, 'statements': Counter()}
+
+    def _request_finished(self, sender, response, **extra):
+        stats = g.pop('_sql_metrics', None)
+        if stats is None or request.endpoint in (None, 'metrics'):
+            return
+        duration = time.perf_counter() - stats['started']
+        labels = (request.endpoint, request.method)
+
+        with self._lock:
+            self._requests[labels + (str(response.status_code),)] += 1
+            self._histograms['duration'].observe(labels, duration)
+            self._histograms['db_time'].observe(labels, stats['db_time'])
+            self._histograms['queries'].observe(labels, stats['queries'])
+            if response.content_length is not None:
+                self._histograms['size'].observe(labels, response.content_length)
+
+        # The same statement shape over and over usually means an N+1 loop
+        if stats['statements']:
+            statement, repeats = stats['statements'].most_common(1)[0]
+            if repeats > self.repeat_threshold:
+                sender.logger.warning(
+                    '%s %s ran the same statement %d times: %s',
+                    request.method, request.path, repeats, ' '.join(statement.split())[:200]
+                )
+
+    def export(self):
+        with self._lock:
+            lines = [
+                '# HELP http_requests_total Requests handled, by endpoint, method and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(
+                    f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}'
+                )
+            for histogram in self._histograms.values():
+                lines.extend(histogram.render(self.LABELS))
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time rides on the statement's execution context, so a
+    # statement that fails (no after_cursor_execute) leaves nothing behind
+    if context is not None and has_request_context() and '_sql_metrics' in g:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None or not has_request_context():
+        return
+    stats = g.get('_sql_metrics')
+    if stats is None:
+        return
+    stats['db_time'] += time.perf_counter() - started
+    stats['queries'] += 1
+    stats['statements'][statement] += 1
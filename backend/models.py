@@ -1,8 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from extensions import db, password_hasher
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import validates
 import enum
+import re
 
 
 class UserType(enum.Enum):
@@ -17,6 +20,33 @@ class BookingStatus(enum.Enum):
     COMPLETED = "completed"
     CANCELLED = "cancelled"
 
+MAX_AREA_LENGTH = 100  # ProviderServiceArea.area
+
+def parse_service_areas(value):
+    # "Lahore, Karachi / DHA" -> ['lahore', 'karachi', 'dha']. Searches go
+    # through here too, so a long area truncated here still matches itself
+    areas = []
+    for part in re.split(r'[,;/|\n]', value or ''):
+        area = ' '.join(part.split()).lower()[:MAX_AREA_LENGTH].rstrip()
+        if area and area not in areas:
+            areas.append(area)
+    return areas
+
+def add_missing_columns(connection, table, names):
+    # create_all() skips existing tables, so columns added to a model later
+    # are ALTERed onto databases created before them
+    existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+    for name in names:
+        if name in existing:
+            continue
+        column = table.c[name]
+        ddl = f'ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(dialect=connection.dialect)}'
+        if column.server_default is not None:
+            ddl += f' DEFAULT {column.server_default.arg}'
+        if not column.nullable:
+            ddl += ' NOT NULL'
+        connection.execute(text(ddl))
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -39,10 +69,15 @@ class User(db.Model):
     reviews_given = db.relationship('Review', foreign_keys='Review.customer_id', backref='reviewer')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # A hash in an older scheme or cost is replaced on a successful
+        # check; the caller commits it
+        matches, new_hash = password_hasher.verify(password, self.password_hash)
+        if new_hash:
+            self.password_hash = new_hash
+        return matches
     
     def to_dict(self):
         return {
@@ -82,6 +117,15 @@ class ServiceCategory(db.Model):
 
 class ServiceProvider(db.Model):
     __tablename__ = 'service_providers'
+    __table_args__ = (
+        db.Index(
+            'ix_service_providers_search_vector',
+            'search_vector',
+            postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+        # Nearest-provider search scans geohash prefix ranges (see geo.py)
+        db.Index('ix_service_providers_geohash', 'geohash'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -95,21 +139,53 @@ class ServiceProvider(db.Model):
     price_unit = db.Column(db.String(50))  # per hour, per session, per meal, etc.
     availability = db.Column(db.JSON)  # Available days and times
     service_area = db.Column(db.String(500))  # Areas they serve
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    service_radius_km = db.Column(db.Float)  # How far they travel; None means no limit
+    geohash = db.Column(db.String(12))  # Of (latitude, longitude), kept by geo.py
     rating = db.Column(db.Numeric(3, 2), default=0.0)
     total_reviews = db.Column(db.Integer, default=0)
-    total_bookings = db.Column(db.Integer, default=0)
+    # Running rating aggregates, kept by the refresh_provider job (aggregates.py)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count_1 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count_2 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count_3 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count_4 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count_5 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_bookings = db.Column(db.Integer, default=0)  # Completed bookings
+    # Listing rank and its inputs, maintained by ranking.py
+    cancelled_bookings = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    recency = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    score = db.Column(db.Float, nullable=False, default=0, server_default='0')
     is_approved = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
     verification_documents = db.Column(db.JSON)  # Document URLs
+    # Full-text document, maintained by search.py (SQLite uses an FTS5 table instead)
+    search_vector = db.deferred(db.Column(TSVECTOR().with_variant(db.Text(), 'sqlite')))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     bookings = db.relationship('Booking', backref='provider')
     reviews = db.relationship('Review', backref='provider')
+    service_areas = db.relationship('ProviderServiceArea', backref='provider', cascade='all, delete-orphan')
     
-    def to_dict(self):
-        return {
+    @validates('service_area')
+    def sync_service_areas(self, key, value):
+        # Keep the indexed area rows in step with the free-text column,
+        # reusing rows that survive so the unique constraint never trips
+        existing = {row.area: row for row in self.service_areas}
+        self.service_areas = [
+            existing.get(area) or ProviderServiceArea(area=area)
+            for area in parse_service_areas(value)
+        ]
+        return value
+    
+    def rating_histogram(self):
+        return {str(star): getattr(self, f'rating_count_{star}') or 0 for star in range(1, 6)}
+    
+    def to_dict(self, include_histogram=False):
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'user': self.user.to_dict() if self.user else None,
@@ -123,27 +199,85 @@ class ServiceProvider(db.Model):
             'price_unit': self.price_unit,
             'availability': self.availability,
             'service_area': self.service_area,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'service_radius_km': self.service_radius_km,
             'rating': float(self.rating) if self.rating else 0.0,
             'total_reviews': self.total_reviews,
             'total_bookings': self.total_bookings,
+            'score': self.score,
             'is_approved': self.is_approved,
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        if include_histogram:
+            data['rating_histogram'] = self.rating_histogram()
+        return data
+
+# The public listing streams approved, active providers by score (within a
+# category when filtered) straight from these, with no sort step
+db.Index(
+    'ix_service_providers_listing',
+    ServiceProvider.is_approved, ServiceProvider.is_active, ServiceProvider.category_id,
+    ServiceProvider.score.desc(), ServiceProvider.id.desc()
+)
+db.Index(
+    'ix_service_providers_listing_all',
+    ServiceProvider.is_approved, ServiceProvider.is_active,
+    ServiceProvider.score.desc(), ServiceProvider.id.desc()
+)
+
+class ProviderServiceArea(db.Model):
+    __tablename__ = 'provider_service_areas'
+    __table_args__ = (
+        db.UniqueConstraint('provider_id', 'area'),
+        db.Index('ix_provider_service_areas_area_provider', 'area', 'provider_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    provider_id = db.Column(db.Integer, db.ForeignKey('service_providers.id'), nullable=False)
+    area = db.Column(db.String(MAX_AREA_LENGTH), nullable=False)  # Normalised (lower-case) area name
+
+class ProviderDailyStats(db.Model):
+    # A provider's bookings per service day, by status; kept by aggregates.py
+    __tablename__ = 'provider_daily_stats'
+    
+    provider_id = db.Column(db.Integer, db.ForeignKey('service_providers.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    pending = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    confirmed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    in_progress = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    cancelled = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    earnings = db.Column(db.Numeric(12, 2), nullable=False, default=0, server_default='0')  # Completed final_price sum
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        # Booking lists: a customer's own bookings, a provider's bookings,
+        # and a provider's bookings in one status, newest first
+        db.Index('ix_bookings_customer_created_id', 'customer_id', 'created_at', 'id'),
+        db.Index('ix_bookings_provider_created_id', 'provider_id', 'created_at', 'id'),
+        db.Index('ix_bookings_provider_status_created_id', 'provider_id', 'status', 'created_at', 'id'),
+        # Slot conflicts: a provider's bookings that end after a given time
+        db.Index('ix_bookings_provider_slot', 'provider_id', 'service_end', 'service_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     provider_id = db.Column(db.Integer, db.ForeignKey('service_providers.id'), nullable=False)
     service_date = db.Column(db.DateTime, nullable=False)
     service_duration = db.Column(db.Integer)  # in minutes
+    service_end = db.Column(db.DateTime)  # service_date + duration, kept by scheduling
     service_address = db.Column(db.Text, nullable=False)
+    latitude = db.Column(db.Float)  # Optional point for service_address
+    longitude = db.Column(db.Float)
     special_requirements = db.Column(db.Text)
     estimated_price = db.Column(db.Numeric(10, 2))
     final_price = db.Column(db.Numeric(10, 2))
     status = db.Column(db.Enum(BookingStatus), default=BookingStatus.PENDING)
+    # Bumped by every status transition (transitions.py)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     payment_status = db.Column(db.String(50), default='pending')
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -157,10 +291,13 @@ class Booking(db.Model):
             'service_date': self.service_date.isoformat() if self.service_date else None,
             'service_duration': self.service_duration,
             'service_address': self.service_address,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
             'special_requirements': self.special_requirements,
             'estimated_price': float(self.estimated_price) if self.estimated_price else None,
             'final_price': float(self.final_price) if self.final_price else None,
             'status': self.status.value,
+            'version': self.version,
             'payment_status': self.payment_status,
             'notes': self.notes,
             'created_at': self.created_at.isoformat() if self.created_at else None
@@ -168,6 +305,9 @@ class Booking(db.Model):
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.Index('ix_reviews_provider_created_id', 'provider_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=False)
@@ -191,4 +331,22 @@ class Review(db.Model):
             'comment': self.comment,
             'is_verified': self.is_verified,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+class Job(db.Model):
+    # A queued background job (jobs.py); deleted once it has run
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_pending', 'kind', 'failed_at', 'run_at', 'id'),
+        db.Index('ix_jobs_provider', 'kind', 'provider_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    provider_id = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.JSON)  # What changed, for the handler to fold in
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    failed_at = db.Column(db.DateTime)  # Set once attempts run out; no longer picked up
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,198 @@
+import base64
+import heapq
+import json
+import math
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import and_, func, or_, select
+
+MAX_PER_PAGE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_more = next_cursor is not None
+        self.total = total
+
+    def meta(self):
+        meta = {'next_cursor': self.next_cursor, 'has_more': self.has_more}
+        if self.total is not None:
+            meta['total'] = self.total
+        return meta
+
+
+def as_bool(value):
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is Decimal:
+        value = Decimal(value)
+        finite = value.is_finite()
+    else:
+        value = python_type(value)
+        finite = python_type is not float or math.isfinite(value)
+    if not finite:
+        raise ValueError('Cursor values must be finite')
+    return value
+
+
+def encode_cursor(row, keys):
+    values = [_dump_value(getattr(row, key.key)) for key in keys]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, keys):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise InvalidCursor('Invalid cursor')
+        return [_load_value(key, value) for key, value in zip(keys, values)]
+    except (ValueError, TypeError, OverflowError, InvalidOperation) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def _after(keys, values):
+    # Row-value "(k1, k2, ...) < (v1, v2, ...)" spelled out so that it works
+    # on every backend and can still be answered from a composite index.
+    clauses = []
+    for i, key in enumerate(keys):
+        prefix = [keys[j] == values[j] for j in range(i)]
+        clauses.append(and_(*prefix, key < values[i]))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, keys, cursor=None, per_page=10, with_total=False):
+    """Paginate ``query`` by seeking past ``cursor`` instead of using OFFSET.
+
+    ``keys`` are the columns the page is ordered by, all descending; the last
+    one must be unique (normally the primary key). An empty cursor asks for
+    the first page.
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    total = query.order_by(None).count() if with_total else None
+
+    if cursor:
+        query = query.filter(_after(keys, decode_cursor(cursor, keys)))
+
+    rows = query.order_by(*[key.desc() for key in keys]).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1], keys)
+
+    return KeysetPage(rows, next_cursor, total)
+
+
+def _sort_key(keys):
+    names = [key.key for key in keys]
+    return lambda row: tuple(getattr(row, name) for name in names)
+
+
+def merge_descending(queries, keys, limit):
+    """Merge the first ``limit`` rows of several queries ordered by ``keys``.
+
+    Each query is ordered and limited on its own, so each one can be served
+    by its own index; a row returned by more than one query appears once.
+    """
+    order = [key.desc() for key in keys]
+    sort_key = _sort_key(keys)
+    streams = [query.order_by(*order).limit(limit).all() for query in queries]
+
+    rows, last = [], None
+    for row in heapq.merge(*streams, key=sort_key, reverse=True):
+        current = sort_key(row)
+        if current != last:
+            rows.append(row)
+            last = current
+            if len(rows) == limit:
+                break
+    return rows
+
+
+def merged_total(queries):
+    return queries[0].union(*queries[1:]).order_by(None).count()
+
+
+def merged_keyset_paginate(queries, keys, cursor=None, per_page=10, with_total=False):
+    """Like keyset_paginate(), over the sorted union of ``queries``."""
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    total = merged_total(queries) if with_total else None
+
+    if cursor:
+        after = _after(keys, decode_cursor(cursor, keys))
+        queries = [query.filter(after) for query in queries]
+
+    rows = merge_descending(queries, keys, per_page + 1)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1], keys)
+
+    return KeysetPage(rows, next_cursor, total)
+
+
+# asyncio variants, for select() statements run on an AsyncSession. Pass
+# ``entities=True`` when the statement loads ORM objects (with joined eager
+# loads) rather than rows.
+
+async def _fetch(session, stmt, entities):
+    result = await session.execute(stmt)
+    return result.unique().scalars().all() if entities else result.all()
+
+
+async def count_async(session, stmt):
+    stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    return (await session.execute(stmt)).scalar_one()
+
+
+async def keyset_paginate_async(session, stmt, keys, cursor=None, per_page=10,
+                                with_total=False, entities=False):
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    total = await count_async(session, stmt) if with_total else None
+
+    if cursor:
+        stmt = stmt.where(_after(keys, decode_cursor(cursor, keys)))
+
+    rows = await _fetch(session, stmt.order_by(*[key.desc() for key in keys]).limit(per_page + 1), entities)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1], keys)
+
+    return KeysetPage(rows, next_cursor, total)
+
+
+async def offset_paginate_async(session, stmt, page=1, per_page=10, entities=False):
+    """Page the way Flask-SQLAlchemy's paginate(error_out=False) does.
+
+    ``stmt`` must already be ordered. Returns ``(items, total, pages)``.
+    """
+    page = max(page, 1)
+    per_page = per_page if per_page >= 1 else 20
+    total = await count_async(session, stmt)
+    items = await _fetch(session, stmt.limit(per_page).offset((page - 1) * per_page), entities)
+    pages = -(-total // per_page)
+    return items, total, pages
@@ -0,0 +1,142 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when more hashing work is queued than the executor allows."""
+
+
+class InvalidPassword(ValueError):
+    """Raised for a password that can't be hashed, e.g. one containing NUL."""
+
+
+def validate_password(password):
+    if not isinstance(password, str):
+        raise InvalidPassword('Password must be a string')
+    # bcrypt rejects NUL bytes
+    if '\x00' in password:
+        raise InvalidPassword('Password must not contain NUL characters')
+
+
+class BcryptHasher:
+    algorithm = 'bcrypt'
+
+    def __init__(self, rounds=12):
+        self.rounds = rounds
+
+    def identifies(self, encoded):
+        return encoded.startswith(('$2a$', '$2b$', '$2y$'))
+
+    def hash(self, password):
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds)).decode()
+
+    def verify(self, password, encoded):
+        try:
+            return bcrypt.checkpw(password.encode(), encoded.encode())
+        except ValueError:
+            return False
+
+    def needs_rehash(self, encoded):
+        # $2b$12$... -> cost 12
+        return int(encoded.split('$')[2]) != self.rounds
+
+
+class WerkzeugHasher:
+    """Werkzeug's "method$salt$hash" format (pbkdf2 or scrypt)."""
+
+    algorithm = 'werkzeug'
+
+    def __init__(self, method='pbkdf2'):
+        self.method = method
+
+    def identifies(self, encoded):
+        return encoded.startswith(('pbkdf2:', 'scrypt:'))
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def verify(self, password, encoded):
+        return check_password_hash(encoded, password)
+
+    def needs_rehash(self, encoded):
+        return not encoded.startswith(self.method)
+
+
+HASHERS = {
+    'bcrypt': BcryptHasher,
+    'werkzeug': WerkzeugHasher,
+}
+
+
+class PasswordHasher:
+    """Hashes new passwords with the configured scheme and verifies any known one.
+
+    Hashing runs in a bounded thread pool. bcrypt releases the GIL, so the
+    pool spreads the work over PASSWORD_HASH_WORKERS cores instead of holding
+    every request thread for the duration. Once PASSWORD_HASH_QUEUE calls are
+    waiting, further calls raise HasherBusy rather than queueing without
+    limit. ``verify()`` also reports a replacement hash when the stored one
+    uses another scheme or cost, so logins upgrade old hashes.
+    """
+
+    def __init__(self, app=None):
+        self.hasher = BcryptHasher()
+        self.legacy = [WerkzeugHasher()]
+        self.workers = os.cpu_count() or 1
+        self.max_pending = self.workers * 8
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        algorithm = app.config.setdefault('PASSWORD_HASHER', 'bcrypt')
+        rounds = app.config.setdefault('BCRYPT_ROUNDS', 12)
+        self.workers = app.config.setdefault('PASSWORD_HASH_WORKERS', self.workers)
+        self.max_pending = app.config.setdefault('PASSWORD_HASH_QUEUE', self.workers * 8)
+
+        if algorithm not in HASHERS:
+            raise ValueError(f'Unknown PASSWORD_HASHER {algorithm!r}')
+        self.hasher = BcryptHasher(rounds) if algorithm == 'bcrypt' else HASHERS[algorithm]()
+        self.legacy = [cls() for name, cls in HASHERS.items() if name != algorithm]
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+                self._slots = threading.BoundedSemaphore(self.max_pending)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy('Too many password checks in progress')
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _hasher_for(self, encoded):
+        for hasher in [self.hasher] + self.legacy:
+            if hasher.identifies(encoded):
+                return hasher
+        return None
+
+    def hash(self, password):
+        validate_password(password)
+        return self._run(self.hasher.hash, password)
+
+    def verify(self, password, encoded):
+        """Return ``(matches, new_hash)``; ``new_hash`` is None unless an upgrade is due."""
+        hasher = self._hasher_for(encoded or '')
+        if hasher is None or not isinstance(password, str) or not self._run(hasher.verify, password, encoded):
+            return False, None
+        if hasher is self.hasher and not hasher.needs_rehash(encoded):
+            return True, None
+        try:
+            return True, self.hash(password)
+        except (HasherBusy, InvalidPassword):
+            # The password was right; upgrade the hash on a quieter login, or
+            # keep a legacy hash of a password bcrypt can't take
+            return True, None
@@ -0,0 +1,111 @@
+from functools import lru_cache
+
+from sqlalchemy import Select
+from sqlalchemy.orm import aliased
+from fieldsets import SCHEMAS, full
+
+# Projection path for list endpoints: select just the columns the response
+# renders as plain rows (no ORM identity map or per-row instrumentation) and
+# build the same shapes as the models' to_dict(), or the sparser ones a
+# Fieldset asks for. Decimal, datetime and Enum values are left as-is for
+# FastJSONProvider to encode.
+
+# Columns selected whatever the fieldset, for cursors and row lookups
+_KEYS = {
+    'provider': ('id', 'score'),
+    'booking': ('id', 'created_at'),
+}
+
+
+def _renderer(pairs, falsy, ids, nested):
+    def render(row):
+        data = {field: row[label] for field, label in pairs}
+        for field, default in falsy:
+            data[field] = data[field] or default
+        for key, label in ids:
+            data[key] = row[label]
+        for key, render_nested in nested:
+            data[key] = render_nested(row)
+        return data
+    return render
+
+
+class Projection:
+    """Columns, joins and row renderer for one Fieldset.
+
+    Expanded relations are joined under aliases named for their path;
+    relations rendered as ids only select the foreign key. ``stamps`` label
+    the updated_at of every joined row, so list responses can be validated
+    (cache.conditional_list).
+    """
+
+    def __init__(self, fieldset):
+        self.model = SCHEMAS[fieldset.schema].model
+        self.columns, self.joins, self.stamps = [], [], []
+        self._labels = set()
+        for name in _KEYS.get(fieldset.schema, ('id',)):
+            self._select(self.model, name, name)
+        self._render = self._plan(fieldset, self.model, '', fieldset.schema)
+
+    def _select(self, entity, name, label):
+        if label not in self._labels:
+            self._labels.add(label)
+            self.columns.append(getattr(entity, name).label(label))
+        return label
+
+    def _plan(self, fieldset, entity, prefix, alias):
+        schema = SCHEMAS[fieldset.schema]
+        pairs = [(field, self._select(entity, field, prefix + field)) for field in fieldset.fields]
+        falsy = [(field, default) for field, default in schema.falsy.items() if field in fieldset.fields]
+        if hasattr(schema.model, 'updated_at'):
+            self.stamps.append(self._select(entity, 'updated_at', prefix + 'updated_at'))
+
+        ids, nested = [], []
+        for key, child in fieldset.relations:
+            relation = schema.relations[key]
+            if child is None:
+                ids.append((key, self._select(entity, relation.foreign_key, prefix + key)))
+                continue
+            target = aliased(SCHEMAS[child.schema].model, name=f'{alias}_{key}')
+            self.joins.append((target, target.id == getattr(entity, relation.foreign_key)))
+            nested.append((key, self._plan(child, target, f'{prefix}{key}__', f'{alias}_{key}')))
+        return _renderer(pairs, falsy, ids, nested)
+
+    def rows(self, query):
+        """Re-target a query or select() on the root model at these columns."""
+        if isinstance(query, Select):
+            query = query.with_only_columns(*self.columns, maintain_column_froms=False)
+            query = query.select_from(self.model)
+        else:
+            query = query.with_entities(*self.columns)
+        for target, onclause in self.joins:
+            query = query.join(target, onclause)
+        return query
+
+    def render(self, row):
+        return self._render(row._mapping)
+
+
+# Aliases and labelled column lists are built once per fieldset; constructing
+# them per request costs about as much as the row handling they save
+@lru_cache(maxsize=256)
+def projection(fieldset):
+    return Projection(fieldset)
+
+
+def provider_rows(query):
+    """Re-target a ServiceProvider query or select() at the full list columns."""
+    return projection(full('provider')).rows(query)
+
+
+def provider_row_to_dict(row):
+    return projection(full('provider')).render(row)
+
+
+def booking_rows(query):
+    """Re-target a Booking query at the full list columns."""
+    return projection(full('booking')).rows(query)
+
+
+def booking_row_to_dict(row):
+    return projection(full('booking')).render(row)
@@ -0,0 +1,156 @@
+from datetime import datetime
+
+from sqlalchemy import bindparam, case, func, update
+
+from models import db, ServiceProvider, Booking, BookingStatus, Review, add_missing_columns
+
+# ServiceProvider.score orders the public listing. It blends
+#
+#   * a Bayesian average rating: PRIOR_REVIEWS imaginary reviews at
+#     PRIOR_RATING are mixed in, so a single 5-star review cannot outrank
+#     hundreds of 4.8s;
+#   * the completion rate, completed / (completed + cancelled), smoothed the
+#     same way, scaling the rating by 0.5 (none completed) to 1.0;
+#   * a recency boost for the provider's last completed booking or review,
+#     stored as its day number in ``recency``. It is worth RECENCY_WEIGHT on
+#     the day and decays to half of that after RECENCY_DAYS, so it can
+#     reorder providers of similar standing but never outweighs the rating.
+#
+# score() is plain arithmetic so the same formula runs in Python and inside
+# the UPDATE that stores it. The completed/cancelled counters move with each
+# booking transition (transitions.py); recency and scores are kept by the
+# refresh_provider job (aggregates.py), off the request path.
+# rebuild_scores() recomputes all of them from the source rows. Stored
+# scores carry the boost as of their last refresh, so ``flask
+# refresh-scores`` should run daily to let idle providers' boosts decay.
+
+PRIOR_RATING = 3.5
+PRIOR_REVIEWS = 10
+RECENCY_WEIGHT = 0.3
+RECENCY_DAYS = 30.0
+RECENCY_EPOCH = datetime(2024, 1, 1)
+
+
+def activity_day(when):
+    # Days since RECENCY_EPOCH, as stored in ServiceProvider.recency
+    return (when - RECENCY_EPOCH).total_seconds() / 86400
+
+
+def _today():
+    return activity_day(datetime.utcnow())
+
+
+def score(rating_sum, review_count, completed, cancelled, recency, today):
+    bayesian = (PRIOR_RATING * PRIOR_REVIEWS + rating_sum) / (PRIOR_REVIEWS + review_count)
+    completion = (completed + 1.0) / (completed + cancelled + 2.0)
+    boost = RECENCY_WEIGHT * RECENCY_DAYS / (RECENCY_DAYS + (today - recency))
+    return bayesian * (0.5 + 0.5 * completion) + boost
+
+
+def _completed():
+    return func.coalesce(ServiceProvider.total_bookings, 0)
+
+
+def recompute_booking_counters(provider_ids=None):
+    """Recompute completed/cancelled counts and recency, in the caller's transaction.
+
+    Covers the given providers, or every provider when ``provider_ids`` is
+    None. Recency comes from the latest completed booking or verified
+    review on record, and is never older than the profile itself, which
+    new_provider_ranking() stamps it with. Scores are left to
+    refresh_scores().
+    """
+    profiles = db.select(ServiceProvider.id, ServiceProvider.created_at)
+    counts = db.select(
+        Booking.provider_id,
+        func.sum(case((Booking.status == BookingStatus.COMPLETED, 1), else_=0)),
+        func.sum(case((Booking.status == BookingStatus.CANCELLED, 1), else_=0)),
+        func.max(case((Booking.status == BookingStatus.COMPLETED, Booking.updated_at))),
+    ).group_by(Booking.provider_id)
+    last_reviews = (
+        db.select(Review.provider_id, func.max(Review.created_at))
+        .where(Review.is_verified.is_(True))
+        .group_by(Review.provider_id)
+    )
+    if provider_ids is not None:
+        profiles = profiles.where(ServiceProvider.id.in_(provider_ids))
+        counts = counts.where(Booking.provider_id.in_(provider_ids))
+        last_reviews = last_reviews.where(Review.provider_id.in_(provider_ids))
+
+    rows = {
+        provider_id: {'completed': 0, 'cancelled': 0, 'last': [created_at]}
+        for provider_id, created_at in db.session.execute(profiles).all()
+    }
+    for provider_id, completed, cancelled, last_completed in db.session.execute(counts).all():
+        if provider_id in rows:
+            rows[provider_id].update(completed=completed, cancelled=cancelled)
+            rows[provider_id]['last'].append(last_completed)
+    for provider_id, last_review in db.session.execute(last_reviews).all():
+        if provider_id in rows:
+            rows[provider_id]['last'].append(last_review)
+
+    params = []
+    for provider_id, row in rows.items():
+        last = max(filter(None, row['last']), default=None)
+        params.append({
+            'id': provider_id,
+            'total_bookings': row['completed'],
+            'cancelled_bookings': row['cancelled'],
+            'recency': activity_day(last) if last else 0,
+        })
+    if params:
+        db.session.execute(update(ServiceProvider), params)
+    return len(params)
+
+
+def touch_recency(changes):
+    """Move recency up to each provider's latest activity.
+
+    ``changes`` maps provider id to the time of its newest completion or
+    review. Recency only moves forward, so jobs folded in any order agree.
+    """
+    if not changes:
+        return
+    providers = ServiceProvider.__table__
+    day = bindparam('day')
+    db.session.execute(
+        providers.update()
+        .where(providers.c.id == bindparam('provider'))
+        .values(recency=case((providers.c.recency < day, day), else_=providers.c.recency)),
+        [{'provider': provider_id, 'day': activity_day(when)} for provider_id, when in changes.items()]
+    )
+
+
+def rebuild_scores():
+    """Recompute the booking counters, recency and score of every provider.
+
+    Also adds the ranking columns and listing indexes to databases created
+    before them.
+    """
+    connection = db.session.connection()
+    add_missing_columns(connection, ServiceProvider.__table__, ('cancelled_bookings', 'recency', 'score'))
+    for index in ServiceProvider.__table__.indexes:
+        if index.name.startswith('ix_service_providers_listing'):
+            index.create(connection, checkfirst=True)
+
+    count = recompute_booking_counters()
+    refresh_scores()
+    db.session.commit()
+    return count
+
+
+def refresh_scores(provider_ids=None):
+    # Recompute scores from their stored inputs, in one UPDATE
+    query = update(ServiceProvider)
+    if provider_ids is not None:
+        query = query.where(ServiceProvider.id.in_(provider_ids))
+    db.session.execute(query.values(score=score(
+        ServiceProvider.rating_sum, ServiceProvider.total_reviews,
+        _completed(), ServiceProvider.cancelled_bookings, ServiceProvider.recency, _today()
+    )), execution_options={'synchronize_session': False})
+
+
+def new_provider_ranking(when=None):
+    """Ranking columns for a new profile: the prior, plus a fresh recency boost."""
+    recency = activity_day(when or datetime.utcnow())
+    return {'recency': recency, 'score': score(0, 0, 0, 0, recency, recency)}
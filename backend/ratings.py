@@ -0,0 +1,87 @@
+from sqlalchemy import bindparam, case, func, update
+from models import db, ServiceProvider, Review
+from ranking import refresh_scores
+
+
+def apply_rating_deltas(changes):
+    """Fold review writes into the providers' running rating aggregates.
+
+    ``changes`` maps provider id to ``(count, total, stars)``: the change in
+    the number of verified reviews, in their rating sum, and in each star's
+    histogram count (``{star: delta}``). One executemany UPDATE moves them
+    with SQL-side increments inside the caller's transaction, so concurrent
+    workers can't lose increments. Scores are left to refresh_scores().
+    """
+    params = [
+        {
+            'provider': provider_id, 'count': count, 'total': total,
+            **{f'star_{star}': stars.get(star, 0) for star in range(1, 6)}
+        }
+        for provider_id, (count, total, stars) in changes.items()
+        if count or total or any(stars.values())
+    ]
+    if not params:
+        return
+
+    providers = ServiceProvider.__table__
+    new_count = providers.c.total_reviews + bindparam('count')
+    new_sum = providers.c.rating_sum + bindparam('total')
+    db.session.execute(
+        providers.update()
+        .where(providers.c.id == bindparam('provider'))
+        .values(
+            total_reviews=new_count,
+            rating_sum=new_sum,
+            # Both sides of SET see the pre-update row, so recompute from the deltas
+            rating=case((new_count > 0, func.round(new_sum * 1.0 / new_count, 2)), else_=0),
+            **{
+                f'rating_count_{star}': providers.c[f'rating_count_{star}'] + bindparam(f'star_{star}')
+                for star in range(1, 6)
+            }
+        ),
+        params
+    )
+
+
+def recompute_ratings(provider_ids=None):
+    """Recompute rating aggregates from verified reviews, in the caller's transaction.
+
+    Covers the given providers, or every provider when ``provider_ids`` is
+    None. Scores are left to refresh_scores().
+    """
+    columns = [
+        Review.provider_id,
+        func.count(Review.id),
+        func.sum(Review.rating),
+    ] + [func.sum(case((Review.rating == star, 1), else_=0)) for star in range(1, 6)]
+    query = db.select(*columns).where(Review.is_verified.is_(True)).group_by(Review.provider_id)
+    reset = update(ServiceProvider)
+    if provider_ids is not None:
+        query = query.where(Review.provider_id.in_(provider_ids))
+        reset = reset.where(ServiceProvider.id.in_(provider_ids))
+    rows = db.session.execute(query).all()
+
+    db.session.execute(reset.values(
+        total_reviews=0, rating_sum=0, rating=0,
+        rating_count_1=0, rating_count_2=0, rating_count_3=0, rating_count_4=0, rating_count_5=0
+    ), execution_options={'synchronize_session': False})
+    if rows:
+        db.session.execute(update(ServiceProvider), [
+            {
+                'id': provider_id,
+                'total_reviews': count,
+                'rating_sum': total,
+                'rating': round(total / count, 2),
+                **{f'rating_count_{star}': histogram[star - 1] for star in range(1, 6)}
+            }
+            for provider_id, count, total, *histogram in rows
+        ])
+    return len(rows)
+
+
+def rebuild_ratings():
+    # Recompute every provider's aggregates from its verified reviews
+    count = recompute_ratings()
+    refresh_scores()
+    db.session.commit()
+    return count
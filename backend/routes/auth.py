@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, current_user
 from models import db, User, UserType
 from datetime import timedelta
+from extensions import response_cache, identity_cache
+from passwords import HasherBusy, InvalidPassword, validate_password
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -34,7 +36,12 @@ def register():
             user_type=user_type,
             location=data.get('location', '')
         )
-        user.set_password(data['password'])
+        try:
+            user.set_password(data['password'])
+        except InvalidPassword as e:
+            return jsonify({'error': str(e)}), 400
+        except HasherBusy:
+            return jsonify({'error': 'Too many sign-ups, try again shortly'}), 503, {'Retry-After': '1'}
         
         db.session.add(user)
         db.session.commit()
@@ -63,14 +70,26 @@ def login():
         if not data.get('email') or not data.get('password'):
             return jsonify({'error': 'Email and password are required'}), 400
         
+        try:
+            validate_password(data['password'])
+        except InvalidPassword as e:
+            return jsonify({'error': str(e)}), 400
+        
         user = User.query.filter_by(email=data['email']).first()
         
-        if not user or not user.check_password(data['password']):
-            return jsonify({'error': 'Invalid email or password'}), 401
+        try:
+            if not user or not user.check_password(data['password']):
+                return jsonify({'error': 'Invalid email or password'}), 401
+        except HasherBusy:
+            return jsonify({'error': 'Too many login attempts, try again shortly'}), 503, {'Retry-After': '1'}
         
         if not user.is_active:
             return jsonify({'error': 'Account is deactivated'}), 401
         
+        # check_password() upgraded a legacy hash
+        if db.session.is_modified(user):
+            db.session.commit()
+        
         access_token = create_access_token(
             identity=user.id,
             expires_delta=timedelta(days=7)
@@ -89,7 +108,7 @@ def login():
 @jwt_required()
 def get_profile():
     try:
-        user_id = get_jwt_identity()
+        user_id = current_user.id
         user = User.query.get(user_id)
         
         if not user:
@@ -104,7 +123,7 @@ def get_profile():
 @jwt_required()
 def update_profile():
     try:
-        user_id = get_jwt_identity()
+        user_id = current_user.id
         user = User.query.get(user_id)
         
         if not user:
@@ -123,6 +142,11 @@ def update_profile():
             user.profile_image = data['profile_image']
         
         db.session.commit()
+        identity_cache.invalidate(user.id)
+        
+        # The provider detail response embeds the user
+        if user.provider_profile:
+            response_cache.invalidate('provider', user.provider_profile.id)
         
         return jsonify({
             'message': 'Profile updated successfully',
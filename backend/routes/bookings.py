@@ -1,55 +1,169 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Booking, BookingStatus, ServiceProvider, User
-from datetime import datetime
+from flask_jwt_extended import jwt_required, current_user
+from models import db, Booking, BookingStatus, ServiceProvider, UserType
+from sqlalchemy import or_
+from pagination import (
+    keyset_paginate, merged_keyset_paginate, merge_descending, merged_total, as_bool, InvalidCursor
+)
+from cache import conditional_list
+from projections import projection
+from fieldsets import load_options, parse_fieldset, to_dict
+from scheduling import ACTIVE_STATUSES, SlotConflict, check_slot, parse_start, slot_guard
+from batch import InvalidBatch, in_request_order, item_result, parse_ids
+from geo import parse_coordinates
+from aggregates import booking_changed, status_changed
+from stats import parse_price
+from loading import eager
+from transitions import TRANSITIONS, BookingState, InvalidTransition, StaleBooking, check_transition, transition
 
 bookings_bp = Blueprint('bookings', __name__)
 
+# Statuses only the booking's provider may set; the rest either party may
+PROVIDER_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS, BookingStatus.COMPLETED)
+
+def _booking_streams(identity, status=None):
+    """One index-backed query per role the user has on a booking.
+
+    Customers are served by (customer_id, created_at) and providers by
+    (provider_id, [status,] created_at), instead of one OR over an EXISTS
+    that no index can answer.
+    """
+    streams = [Booking.query.filter(Booking.customer_id == identity.id)]
+    if identity.provider_id is not None:
+        streams.append(Booking.query.filter(Booking.provider_id == identity.provider_id))
+    if status is not None:
+        streams = [query.filter(Booking.status == status) for query in streams]
+    return streams
+
+def _booking_page(projected, key_rows, order_keys):
+    # Render a page picked from the merged key streams in one query
+    ids = [row.id for row in key_rows]
+    if not ids:
+        return []
+    query = projected.rows(Booking.query.filter(Booking.id.in_(ids)))
+    return query.order_by(*[key.desc() for key in order_keys]).all()
+
 @bookings_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_bookings():
     try:
-        current_user_id = get_jwt_identity()
+        try:
+            fieldset = parse_fieldset(request.args, 'booking')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if 'ids' in request.args:
+            return _get_bookings_by_id(fieldset)
+        
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
         
-        query = Booking.query.filter(
-            (Booking.customer_id == current_user_id) |
-            (Booking.provider.has(user_id=current_user_id))
-        )
-        
+        status_enum = None
         if status:
             try:
                 status_enum = BookingStatus(status)
-                query = query.filter_by(status=status_enum)
             except ValueError:
                 return jsonify({'error': 'Invalid status'}), 400
         
-        bookings = query.order_by(Booking.created_at.desc()).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        streams = _booking_streams(current_user, status_enum)
+        order_keys = [Booking.created_at, Booking.id]
+        cursor = request.args.get('cursor')
+        projected = projection(fieldset)
         
-        return jsonify({
-            'bookings': [booking.to_dict() for booking in bookings.items],
-            'total': bookings.total,
-            'pages': bookings.pages,
+        if len(streams) == 1:
+            query = projected.rows(streams[0])
+            
+            if cursor is not None:
+                try:
+                    bookings = keyset_paginate(
+                        query,
+                        order_keys,
+                        cursor=cursor,
+                        per_page=per_page,
+                        with_total=request.args.get('include_total', type=as_bool)
+                    )
+                except InvalidCursor:
+                    return jsonify({'error': 'Invalid cursor'}), 400
+                
+                return conditional_list('bookings', bookings.items, projected.render, projected.stamps, bookings.meta())
+            
+            bookings = query.order_by(*[key.desc() for key in order_keys]).paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
+            )
+            
+            return conditional_list('bookings', bookings.items, projected.render, projected.stamps, {
+                'total': bookings.total,
+                'pages': bookings.pages,
+                'current_page': page
+            })
+        
+        # Customer and provider at once: merge the two sorted key streams
+        key_streams = [query.with_entities(*order_keys) for query in streams]
+        
+        if cursor is not None:
+            try:
+                keys_page = merged_keyset_paginate(
+                    key_streams,
+                    order_keys,
+                    cursor=cursor,
+                    per_page=per_page,
+                    with_total=request.args.get('include_total', type=as_bool)
+                )
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            
+            return conditional_list(
+                'bookings', _booking_page(projected, keys_page.items, order_keys), projected.render, projected.stamps,
+                keys_page.meta()
+            )
+        
+        page = max(page, 1)
+        per_page = max(per_page, 1)
+        key_rows = merge_descending(key_streams, order_keys, page * per_page)[(page - 1) * per_page:]
+        total = merged_total(key_streams)
+        
+        return conditional_list('bookings', _booking_page(projected, key_rows, order_keys), projected.render, projected.stamps, {
+            'total': total,
+            'pages': -(-total // per_page),
             'current_page': page
-        }), 200
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _visible_to(identity):
+    # Bookings the user is a party to, as customer or as provider
+    if identity.provider_id is None:
+        return Booking.customer_id == identity.id
+    return or_(Booking.customer_id == identity.id, Booking.provider_id == identity.provider_id)
+
+def _get_bookings_by_id(fieldset):
+    # ?ids=1,2,3: bookings the user cannot see are reported as missing
+    try:
+        ids = parse_ids(request.args['ids'])
+    except InvalidBatch as e:
+        return jsonify({'error': str(e)}), 400
+    
+    bookings = Booking.query.options(*load_options(fieldset)).filter(
+        Booking.id.in_(ids), _visible_to(current_user)
+    ).all()
+    bookings, missing = in_request_order(ids, bookings)
+    
+    return jsonify({
+        'bookings': [to_dict(booking, fieldset) for booking in bookings],
+        'missing': missing
+    }), 200
+
 @bookings_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_booking():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = current_user.id
         
-        if current_user.user_type != 'customer':
+        if current_user.user_type != UserType.CUSTOMER:
             return jsonify({'error': 'Only customers can create bookings'}), 403
         
         data = request.get_json()
@@ -66,22 +180,38 @@ def create_booking():
         
         # Parse service date
         try:
-            service_date = datetime.fromisoformat(data['service_date'].replace('Z', '+00:00'))
+            service_date = parse_start(data['service_date'])
         except ValueError:
             return jsonify({'error': 'Invalid service date format'}), 400
         
+        try:
+            latitude, longitude = parse_coordinates(data.get('latitude'), data.get('longitude'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         booking = Booking(
             customer_id=current_user_id,
-            provider_id=data['provider_id'],
+            provider_id=provider.id,
             service_date=service_date,
             service_duration=data.get('service_duration'),
             service_address=data['service_address'],
+            latitude=latitude,
+            longitude=longitude,
             special_requirements=data.get('special_requirements', ''),
             estimated_price=data.get('estimated_price')
         )
         
-        db.session.add(booking)
-        db.session.commit()
+        # Check and insert under the provider's slot lock so two requests
+        # cannot both take the same time
+        try:
+            with slot_guard(provider.id):
+                check_slot(provider.id, booking.service_date, booking.service_end)
+                db.session.add(booking)
+                booking_changed(provider.id, booking.service_date, added=BookingStatus.PENDING)
+                db.session.commit()
+        except SlotConflict as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 409
         
         return jsonify({
             'message': 'Booking created successfully',
@@ -96,18 +226,22 @@ def create_booking():
 @jwt_required()
 def get_booking(booking_id):
     try:
-        current_user_id = get_jwt_identity()
-        booking = Booking.query.get(booking_id)
+        try:
+            fieldset = parse_fieldset(request.args, 'booking')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        booking = Booking.query.options(*load_options(fieldset)).get(booking_id)
         
         if not booking:
             return jsonify({'error': 'Booking not found'}), 404
         
         # Check if user is authorized to view this booking
-        if (booking.customer_id != current_user_id and 
-            booking.provider.user_id != current_user_id):
+        if (booking.customer_id != current_user.id and 
+            booking.provider_id != current_user.provider_id):
             return jsonify({'error': 'Unauthorized'}), 403
         
-        return jsonify({'booking': booking.to_dict()}), 200
+        return jsonify({'booking': to_dict(booking, fieldset)}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -115,11 +249,23 @@ def get_booking(booking_id):
 @bookings_bp.route('/<int:booking_id>/status', methods=['PUT'])
 @jwt_required()
 def update_booking_status(booking_id):
+    """Move one booking along TRANSITIONS (transitions.py).
+
+    Body: ``{"status": "...", "notes"?, "final_price"?, "version"?}``. The
+    write only applies if the booking is still at the status and version
+    read here, or at ``version`` when the client sends the one it saw;
+    otherwise it answers 409. Sending the status the booking already has
+    only writes ``notes``/``final_price``, or nothing.
+    """
     try:
-        current_user_id = get_jwt_identity()
-        booking = Booking.query.get(booking_id)
+        row = db.session.execute(
+            db.select(
+                Booking.id, Booking.customer_id, Booking.provider_id, Booking.status, Booking.version,
+                Booking.service_date, Booking.service_end, Booking.final_price
+            ).where(Booking.id == booking_id)
+        ).first()
         
-        if not booking:
+        if not row:
             return jsonify({'error': 'Booking not found'}), 404
         
         data = request.get_json()
@@ -134,27 +280,58 @@ def update_booking_status(booking_id):
             return jsonify({'error': 'Invalid status'}), 400
         
         # Check authorization based on status change
-        if status_enum in [BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS, BookingStatus.COMPLETED]:
+        is_provider = row.provider_id == current_user.provider_id
+        if not is_provider and row.customer_id != current_user.id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        if status_enum in PROVIDER_STATUSES and not is_provider:
             # Only provider can update to these statuses
-            if booking.provider.user_id != current_user_id:
-                return jsonify({'error': 'Unauthorized'}), 403
-        elif status_enum == BookingStatus.CANCELLED:
-            # Both customer and provider can cancel
-            if (booking.customer_id != current_user_id and 
-                booking.provider.user_id != current_user_id):
-                return jsonify({'error': 'Unauthorized'}), 403
-        
-        booking.status = status_enum
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        version = data.get('version', row.version)
+        if not isinstance(version, int) or isinstance(version, bool):
+            return jsonify({'error': 'Version must be an integer'}), 400
+        
+        if status_enum != row.status:
+            try:
+                check_transition(row.status, status_enum)
+            except InvalidTransition as e:
+                return jsonify({'error': str(e)}), 409
+        
+        values = {}
         if 'notes' in data:
-            booking.notes = data['notes']
-        if 'final_price' in data and booking.provider.user_id == current_user_id:
-            booking.final_price = data['final_price']
+            values['notes'] = data['notes']
+        if 'final_price' in data and is_provider:
+            try:
+                values['final_price'] = parse_price(data['final_price'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
-        # Update provider's total bookings when completed
-        if status_enum == BookingStatus.COMPLETED:
-            booking.provider.total_bookings += 1
+        if values or status_enum != row.status:
+            # A cancelled booking coming back has to find its slot still free
+            reactivated = row.status not in ACTIVE_STATUSES and status_enum in ACTIVE_STATUSES
+            
+            # Counters move with the status; the ranking score and daily stats
+            # are updated after commit
+            status_changed(
+                row.provider_id, row.service_date, row.status, status_enum,
+                row.final_price, values.get('final_price', row.final_price)
+            )
+            expected = BookingState(row.id, row.provider_id, row.status, version)
+            
+            try:
+                if reactivated:
+                    with slot_guard(row.provider_id):
+                        check_slot(row.provider_id, row.service_date, row.service_end, exclude_id=row.id)
+                        transition([expected], status_enum, **values)
+                        db.session.commit()
+                else:
+                    transition([expected], status_enum, **values)
+                    db.session.commit()
+            except (SlotConflict, StaleBooking) as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 409
         
-        db.session.commit()
+        booking = Booking.query.options(*eager(Booking)).get(booking_id)
         
         return jsonify({
             'message': 'Booking status updated successfully',
@@ -163,4 +340,76 @@ def update_booking_status(booking_id):
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@bookings_bp.route('/status:batch', methods=['POST'])
+@jwt_required()
+def update_booking_statuses():
+    """Move many bookings to one status in a single transaction.
+
+    Body: ``{"ids": [...], "status": "...", "notes"?: "..."}``. Each id gets
+    its own result; the allowed ones are written with one conditional UPDATE
+    (transitions.transition). Bookings already at the status are left as
+    they are.
+    """
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            ids = parse_ids(data.get('ids'))
+        except InvalidBatch as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not data.get('status'):
+            return jsonify({'error': 'Status is required'}), 400
+        
+        try:
+            status_enum = BookingStatus(data['status'])
+        except ValueError:
+            return jsonify({'error': 'Invalid status'}), 400
+        
+        rows = db.session.query(
+            Booking.id, Booking.customer_id, Booking.provider_id, Booking.status, Booking.version,
+            Booking.service_date, Booking.final_price
+        ).filter(Booking.id.in_(ids)).with_for_update().all()
+        rows = {row.id: row for row in rows}
+        
+        results, updated = [], []
+        for booking_id in ids:
+            row = rows.get(booking_id)
+            is_provider = row is not None and row.provider_id == current_user.provider_id
+            
+            if row is None or not (is_provider or row.customer_id == current_user.id):
+                results.append(item_result(booking_id, 'Booking not found'))
+            elif status_enum in PROVIDER_STATUSES and not is_provider:
+                results.append(item_result(booking_id, 'Unauthorized'))
+            elif row.status == status_enum:
+                results.append(item_result(booking_id))
+            elif status_enum not in TRANSITIONS[row.status]:
+                results.append(item_result(booking_id, f'Cannot change a {row.status.value} booking to {status_enum.value}'))
+            elif row.status not in ACTIVE_STATUSES and status_enum in ACTIVE_STATUSES:
+                # Reactivation needs a slot check; leave it to the single endpoint
+                results.append(item_result(booking_id, 'Reactivate bookings one at a time'))
+            else:
+                results.append(item_result(booking_id))
+                updated.append(row)
+                status_changed(
+                    row.provider_id, row.service_date, row.status, status_enum, row.final_price, row.final_price
+                )
+        
+        values = {}
+        if 'notes' in data:
+            values['notes'] = data['notes']
+        try:
+            transition(updated, status_enum, **values)
+        except StaleBooking as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 409
+        
+        db.session.commit()
+        
+        return jsonify({'results': results, 'updated': len(updated)}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
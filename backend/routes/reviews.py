@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from models import db, Review, Booking, BookingStatus, ServiceProvider
-from sqlalchemy import func
+from pagination import keyset_paginate, as_bool, InvalidCursor
+from listing import REVIEW_ORDER
+from aggregates import review_changed
+from fieldsets import load_options, parse_fieldset, to_dict
 
 reviews_bp = Blueprint('reviews', __name__)
 
@@ -11,17 +14,43 @@ def get_provider_reviews(provider_id):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        reviews = Review.query.filter_by(
+        try:
+            fieldset = parse_fieldset(request.args, 'review')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = Review.query.options(*load_options(fieldset)).filter_by(
             provider_id=provider_id,
             is_verified=True
-        ).order_by(Review.created_at.desc()).paginate(
+        )
+        order_keys = REVIEW_ORDER
+        
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            try:
+                reviews = keyset_paginate(
+                    query,
+                    order_keys,
+                    cursor=cursor,
+                    per_page=per_page,
+                    with_total=request.args.get('include_total', type=as_bool)
+                )
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            
+            return jsonify({
+                'reviews': [to_dict(review, fieldset) for review in reviews.items],
+                **reviews.meta()
+            }), 200
+        
+        reviews = query.order_by(*[key.desc() for key in order_keys]).paginate(
             page=page,
             per_page=per_page,
             error_out=False
         )
         
         return jsonify({
-            'reviews': [review.to_dict() for review in reviews.items],
+            'reviews': [to_dict(review, fieldset) for review in reviews.items],
             'total': reviews.total,
             'pages': reviews.pages,
             'current_page': page
@@ -34,7 +63,7 @@ def get_provider_reviews(provider_id):
 @jwt_required()
 def create_review():
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = current_user.id
         data = request.get_json()
         
         required_fields = ['booking_id', 'rating']
@@ -74,17 +103,8 @@ def create_review():
         
         db.session.add(review)
         
-        # Update provider's rating and review count
-        provider = booking.provider
-        provider.total_reviews += 1
-        
-        # Calculate new average rating
-        avg_rating = db.session.query(func.avg(Review.rating)).filter_by(
-            provider_id=provider.id,
-            is_verified=True
-        ).scalar()
-        
-        provider.rating = round(avg_rating, 2) if avg_rating else 0
+        # The provider's rating aggregates are updated after commit
+        review_changed(booking.provider_id, added=rating)
         
         db.session.commit()
         
@@ -101,7 +121,7 @@ def create_review():
 @jwt_required()
 def update_review(review_id):
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = current_user.id
         review = Review.query.get(review_id)
         
         if not review:
@@ -111,6 +131,7 @@ def update_review(review_id):
             return jsonify({'error': 'Unauthorized'}), 403
         
         data = request.get_json()
+        old_rating = review.rating
         
         if 'rating' in data:
             rating = data['rating']
@@ -121,16 +142,9 @@ def update_review(review_id):
         if 'comment' in data:
             review.comment = data['comment']
         
-        db.session.commit()
+        if review.is_verified:
+            review_changed(review.provider_id, added=review.rating, removed=old_rating)
         
-        # Recalculate provider rating
-        provider = review.provider
-        avg_rating = db.session.query(func.avg(Review.rating)).filter_by(
-            provider_id=provider.id,
-            is_verified=True
-        ).scalar()
-        
-        provider.rating = round(avg_rating, 2) if avg_rating else 0
         db.session.commit()
         
         return jsonify({
@@ -146,7 +160,7 @@ def update_review(review_id):
 @jwt_required()
 def delete_review(review_id):
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = current_user.id
         review = Review.query.get(review_id)
         
         if not review:
@@ -155,18 +169,10 @@ def delete_review(review_id):
         if review.customer_id != current_user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        provider = review.provider
-        provider.total_reviews -= 1
-        
         db.session.delete(review)
         
-        # Recalculate provider rating
-        avg_rating = db.session.query(func.avg(Review.rating)).filter_by(
-            provider_id=provider.id,
-            is_verified=True
-        ).scalar()
-        
-        provider.rating = round(avg_rating, 2) if avg_rating else 0
+        if review.is_verified:
+            review_changed(review.provider_id, removed=review.rating)
         db.session.commit()
         
         return jsonify({'message': 'Review deleted successfully'}), 200
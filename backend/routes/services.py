@@ -1,11 +1,27 @@
+import math
+
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, ServiceProvider, ServiceCategory, User, UserType
+from flask_jwt_extended import jwt_required, current_user
+from models import db, ServiceProvider, ServiceCategory, UserType
 from sqlalchemy import or_, and_
+from pagination import keyset_paginate, as_bool, InvalidCursor
+from loading import eager
+from search import search_providers
+from extensions import response_cache
+from cache import conditional_list
+from projections import projection
+from fieldsets import load_options, parse_fieldset, to_dict
+from listing import PROVIDER_ORDER, provider_filters, parse_facets, facet_query, facet_counts
+from scheduling import booking_end, parse_start, provider_busy
+from batch import InvalidBatch, in_request_order, item_result, parse_ids
+from stats import provider_stats
+from ranking import new_provider_ranking
+from geo import near_query, parse_coordinates, parse_near, parse_radius
 
 services_bp = Blueprint('services', __name__)
 
 @services_bp.route('/categories', methods=['GET'])
+@response_cache.cached('categories')
 def get_categories():
     try:
         categories = ServiceCategory.query.filter_by(is_active=True).all()
@@ -19,9 +35,6 @@ def get_categories():
 @jwt_required()
 def create_category():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
         if current_user.user_type != UserType.ADMIN:
             return jsonify({'error': 'Unauthorized'}), 403
         
@@ -38,6 +51,7 @@ def create_category():
         
         db.session.add(category)
         db.session.commit()
+        response_cache.invalidate('categories')
         
         return jsonify({
             'message': 'Category created successfully',
@@ -48,64 +62,208 @@ def create_category():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _provider_list(query, fieldset, relevance=None, extra=None):
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 12, type=int)
+    
+    # Fetch plain rows of just the rendered columns
+    projected = projection(fieldset)
+    query = projected.rows(query)
+    
+    # Order by ranking score
+    order_keys = PROVIDER_ORDER
+    
+    # Cursor mode: seek past the last row seen instead of counting and
+    # skipping rows, so deep pages cost the same as the first one
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            providers = keyset_paginate(
+                query,
+                order_keys,
+                cursor=cursor,
+                per_page=per_page,
+                with_total=request.args.get('include_total', type=as_bool)
+            )
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        return conditional_list(
+            'providers', providers.items, projected.render, projected.stamps,
+            {**providers.meta(), **(extra or {})}
+        )
+    
+    # Search results are ranked by relevance first (cursor mode keeps the
+    # rating order, since relevance is not part of the cursor key)
+    if relevance is not None:
+        query = query.order_by(relevance.desc())
+    query = query.order_by(*[key.desc() for key in order_keys])
+    
+    providers = query.paginate(
+        page=page,
+        per_page=per_page,
+        error_out=False
+    )
+    
+    return conditional_list('providers', providers.items, projected.render, projected.stamps, {
+        'total': providers.total,
+        'pages': providers.pages,
+        'current_page': page,
+        **(extra or {})
+    })
+
+def _nearby_list(query, fieldset, latitude, longitude, radius_km, extra=None):
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(request.args.get('per_page', 12, type=int), 1)
+    
+    # Distances are computed, filtered and paged in SQL, nearest first
+    query, distance = near_query(query, latitude, longitude, radius_km)
+    projected = projection(fieldset)
+    providers = (
+        projected.rows(query).add_columns(distance.label('distance'))
+        .order_by(distance, ServiceProvider.id)
+        .paginate(page=page, per_page=per_page, error_out=False)
+    )
+    
+    def render(row):
+        provider = projected.render(row)
+        provider['distance_km'] = round(math.sqrt(row.distance), 2)
+        return provider
+    
+    # Distances follow from the URL and the rows' coordinates, which the
+    # rows' stamps already cover
+    return conditional_list('providers', providers.items, render, projected.stamps, {
+        'total': providers.total,
+        'pages': providers.pages,
+        'current_page': page,
+        **(extra or {})
+    })
+
 @services_bp.route('/providers', methods=['GET'])
 def get_providers():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 12, type=int)
-        category_id = request.args.get('category_id', type=int)
-        location = request.args.get('location')
-        search = request.args.get('search')
-        min_rating = request.args.get('min_rating', type=float)
-        
-        query = ServiceProvider.query.filter_by(is_approved=True, is_active=True)
+        try:
+            fieldset = parse_fieldset(request.args, 'provider')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if category_id:
-            query = query.filter_by(category_id=category_id)
+        if 'ids' in request.args:
+            return _get_providers_by_id(fieldset)
         
-        if location:
-            query = query.filter(ServiceProvider.service_area.ilike(f'%{location}%'))
+        search = request.args.get('search')
         
+        # ?near=lat,lng&radius_km=: providers around a point, nearest first
+        try:
+            near = parse_near(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # ?facets=category,location,rating: option counts for the filter panel
+        extra = None
+        if request.args.get('facets'):
+            try:
+                facets = parse_facets(request.args['facets'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            rows = db.session.execute(facet_query(request.args, facets, near=near)).all()
+            extra = {'facets': facet_counts(rows, facets)}
+        
+        query = provider_filters(ServiceProvider.query.filter_by(is_approved=True, is_active=True), request.args)
+        
+        relevance = None
         if search:
-            query = query.join(User).filter(
-                or_(
-                    ServiceProvider.service_title.ilike(f'%{search}%'),
-                    ServiceProvider.description.ilike(f'%{search}%'),
-                    User.name.ilike(f'%{search}%')
-                )
-            )
+            query, relevance = search_providers(query, search)
         
-        if min_rating:
-            query = query.filter(ServiceProvider.rating >= min_rating)
+        if near:
+            return _nearby_list(query, fieldset, *near, extra=extra)
         
-        # Order by rating and total reviews
-        query = query.order_by(ServiceProvider.rating.desc(), ServiceProvider.total_reviews.desc())
+        return _provider_list(query, fieldset, relevance, extra)
         
-        providers = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _get_providers_by_id(fieldset):
+    # ?ids=1,2,3: the detail rendering of each provider, from one IN query
+    try:
+        ids = parse_ids(request.args['ids'])
+    except InvalidBatch as e:
+        return jsonify({'error': str(e)}), 400
+    
+    providers = ServiceProvider.query.options(*load_options(fieldset)).filter(
+        ServiceProvider.id.in_(ids)
+    ).all()
+    providers, missing = in_request_order(ids, providers)
+    
+    return jsonify({
+        'providers': [to_dict(provider, fieldset, include_histogram=True) for provider in providers],
+        'missing': missing
+    }), 200
+
+@services_bp.route('/providers/available', methods=['GET'])
+def get_available_providers():
+    try:
+        try:
+            fieldset = parse_fieldset(request.args, 'provider')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        start = request.args.get('start')
+        if not start:
+            return jsonify({'error': 'start is required'}), 400
+        try:
+            start = parse_start(start)
+        except ValueError:
+            return jsonify({'error': 'Invalid start format'}), 400
+        
+        duration = request.args.get('duration', type=int)
+        if duration is not None and duration <= 0:
+            return jsonify({'error': 'Invalid duration'}), 400
+        end = booking_end(start, duration)
+        
+        # Free providers are the ones with no active booking overlapping the
+        # slot; the anti-join runs in SQL against the slot index
+        query = provider_filters(
+            ServiceProvider.query.filter_by(is_approved=True, is_active=True), request.args
+        ).filter(~provider_busy(ServiceProvider.id, start, end))
+        
+        return _provider_list(query, fieldset)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@services_bp.route('/providers/me/stats', methods=['GET'])
+@jwt_required()
+def get_my_provider_stats():
+    try:
+        if current_user.provider_id is None:
+            return jsonify({'error': 'Provider profile not found'}), 404
+        
+        days = min(max(request.args.get('days', 30, type=int), 1), 366)
+        provider = ServiceProvider.query.options(*eager(ServiceProvider)).get(current_user.provider_id)
         
         return jsonify({
-            'providers': [provider.to_dict() for provider in providers.items],
-            'total': providers.total,
-            'pages': providers.pages,
-            'current_page': page
+            'provider': provider.to_dict(),
+            'stats': provider_stats(provider.id, days)
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @services_bp.route('/providers/<int:provider_id>', methods=['GET'])
+@response_cache.cached('provider', 'provider_id')
 def get_provider(provider_id):
     try:
-        provider = ServiceProvider.query.get(provider_id)
+        try:
+            fieldset = parse_fieldset(request.args, 'provider')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        provider = ServiceProvider.query.options(*load_options(fieldset)).get(provider_id)
         
         if not provider:
             return jsonify({'error': 'Provider not found'}), 404
         
-        return jsonify({'provider': provider.to_dict()}), 200
+        return jsonify({'provider': to_dict(provider, fieldset, include_histogram=True)}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -114,14 +272,14 @@ def get_provider(provider_id):
 @jwt_required()
 def create_provider_profile():
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user_id = current_user.id
         
         if current_user.user_type != UserType.PROVIDER:
             return jsonify({'error': 'Only service providers can create profiles'}), 403
         
-        # Check if user already has a provider profile
-        existing_provider = ServiceProvider.query.filter_by(user_id=current_user_id).first()
+        # Check if user already has a provider profile. The cached identity
+        # may predate a profile created by another worker, so ask the database
+        existing_provider = db.session.query(ServiceProvider.id).filter_by(user_id=current_user_id).first()
         if existing_provider:
             return jsonify({'error': 'Provider profile already exists'}), 400
         
@@ -132,6 +290,12 @@ def create_provider_profile():
             if field not in data or not data[field]:
                 return jsonify({'error': f'{field} is required'}), 400
         
+        try:
+            latitude, longitude = parse_coordinates(data.get('latitude'), data.get('longitude'))
+            service_radius_km = parse_radius(data.get('service_radius_km'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         provider = ServiceProvider(
             user_id=current_user_id,
             category_id=data['category_id'],
@@ -144,7 +308,11 @@ def create_provider_profile():
             price_unit=data.get('price_unit'),
             availability=data.get('availability', {}),
             service_area=data.get('service_area', ''),
-            verification_documents=data.get('verification_documents', [])
+            latitude=latitude,
+            longitude=longitude,
+            service_radius_km=service_radius_km,
+            verification_documents=data.get('verification_documents', []),
+            **new_provider_ranking()
         )
         
         db.session.add(provider)
@@ -163,7 +331,7 @@ def create_provider_profile():
 @jwt_required()
 def update_provider_profile(provider_id):
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = current_user.id
         provider = ServiceProvider.query.get(provider_id)
         
         if not provider:
@@ -181,11 +349,22 @@ def update_provider_profile(provider_id):
             'service_area', 'verification_documents'
         ]
         
+        try:
+            if 'latitude' in data or 'longitude' in data:
+                provider.latitude, provider.longitude = parse_coordinates(
+                    data.get('latitude', provider.latitude), data.get('longitude', provider.longitude)
+                )
+            if 'service_radius_km' in data:
+                provider.service_radius_km = parse_radius(data['service_radius_km'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         for field in updatable_fields:
             if field in data:
                 setattr(provider, field, data[field])
         
         db.session.commit()
+        response_cache.invalidate('provider', provider_id)
         
         return jsonify({
             'message': 'Provider profile updated successfully',
@@ -196,13 +375,55 @@ def update_provider_profile(provider_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@services_bp.route('/providers/approve:batch', methods=['POST'])
+@jwt_required()
+def approve_providers():
+    try:
+        if current_user.user_type != UserType.ADMIN:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        try:
+            ids = parse_ids((request.get_json() or {}).get('ids'))
+        except InvalidBatch as e:
+            return jsonify({'error': str(e)}), 400
+        
+        rows = db.session.query(ServiceProvider.id, ServiceProvider.is_approved).filter(
+            ServiceProvider.id.in_(ids)
+        ).with_for_update().all()
+        approved = {row.id: row.is_approved for row in rows}
+        
+        results, pending = [], []
+        for provider_id in ids:
+            if provider_id not in approved:
+                results.append(item_result(provider_id, 'Provider not found'))
+            else:
+                results.append(item_result(provider_id))
+                if not approved[provider_id]:
+                    pending.append(provider_id)
+        
+        # One UPDATE for the whole batch; already-approved rows are left alone
+        if pending:
+            db.session.execute(
+                db.update(ServiceProvider)
+                .where(ServiceProvider.id.in_(pending))
+                .values(is_approved=True),
+                execution_options={'synchronize_session': False}
+            )
+        db.session.commit()
+        
+        for provider_id in pending:
+            response_cache.invalidate('provider', provider_id)
+        
+        return jsonify({'results': results, 'updated': len(pending)}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @services_bp.route('/providers/<int:provider_id>/approve', methods=['POST'])
 @jwt_required()
 def approve_provider(provider_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
         if current_user.user_type != UserType.ADMIN:
             return jsonify({'error': 'Unauthorized'}), 403
         
@@ -212,6 +433,7 @@ def approve_provider(provider_id):
         
         provider.is_approved = True
         db.session.commit()
+        response_cache.invalidate('provider', provider_id)
         
         return jsonify({
             'message': 'Provider approved successfully',
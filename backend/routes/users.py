@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from models import db, User, UserType
+from extensions import response_cache, identity_cache
+from batch import InvalidBatch, in_request_order, parse_ids
+from fieldsets import parse_fieldset, to_dict
 
 users_bp = Blueprint('users', __name__)
 
@@ -8,6 +11,23 @@ users_bp = Blueprint('users', __name__)
 @jwt_required()
 def get_users():
     try:
+        try:
+            fieldset = parse_fieldset(request.args, 'user')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if 'ids' in request.args:
+            try:
+                ids = parse_ids(request.args['ids'])
+            except InvalidBatch as e:
+                return jsonify({'error': str(e)}), 400
+            
+            users, missing = in_request_order(ids, User.query.filter(User.id.in_(ids)).all())
+            return jsonify({
+                'users': [to_dict(user, fieldset) for user in users],
+                'missing': missing
+            }), 200
+        
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         user_type = request.args.get('user_type')
@@ -28,7 +48,7 @@ def get_users():
         )
         
         return jsonify({
-            'users': [user.to_dict() for user in users.items],
+            'users': [to_dict(user, fieldset) for user in users.items],
             'total': users.total,
             'pages': users.pages,
             'current_page': page
@@ -41,12 +61,17 @@ def get_users():
 @jwt_required()
 def get_user(user_id):
     try:
+        try:
+            fieldset = parse_fieldset(request.args, 'user')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         user = User.query.get(user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify({'user': user.to_dict()}), 200
+        return jsonify({'user': to_dict(user, fieldset)}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -55,9 +80,6 @@ def get_user(user_id):
 @jwt_required()
 def verify_user(user_id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
         # Only admin can verify users
         if current_user.user_type != UserType.ADMIN:
             return jsonify({'error': 'Unauthorized'}), 403
@@ -68,6 +90,10 @@ def verify_user(user_id):
         
         user.is_verified = True
         db.session.commit()
+        identity_cache.invalidate(user.id)
+        
+        if user.provider_profile:
+            response_cache.invalidate('provider', user.provider_profile.id)
         
         return jsonify({
             'message': 'User verified successfully',
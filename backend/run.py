@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 import os
-from app import app
+from app import create_app
+
+app = create_app()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,158 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+from extensions import db
+from models import Booking, BookingStatus
+
+# Bookings without a duration hold the provider for this many minutes
+DEFAULT_DURATION = 60
+
+# Bookings in these states occupy their slot; cancelled and completed ones
+# free it
+ACTIVE_STATUSES = (BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS)
+
+SLOT_CONSTRAINT = 'bookings_no_overlap'
+
+# Advisory lock namespace for pg_advisory_xact_lock(key, provider_id)
+_LOCK_KEY = 0x6b6b
+
+_PG_CONSTRAINT = f"""
+    ALTER TABLE bookings ADD CONSTRAINT {SLOT_CONSTRAINT}
+    EXCLUDE USING gist (provider_id WITH =, tsrange(service_date, service_end, '[)') WITH &&)
+    WHERE (status IN ({', '.join(f"'{status.name}'" for status in ACTIVE_STATUSES)}))
+"""
+
+# Striped in-process locks for backends without advisory locks
+_local_locks = [threading.Lock() for _ in range(64)]
+
+
+class SlotConflict(Exception):
+    pass
+
+
+def parse_start(value):
+    """Parse an ISO timestamp into the naive UTC the booking columns hold."""
+    start = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    return start
+
+
+def booking_end(start, duration):
+    return start + timedelta(minutes=duration or DEFAULT_DURATION)
+
+
+def overlaps(start, end):
+    """Active bookings that intersect the half-open interval [start, end)."""
+    return db.and_(
+        Booking.status.in_(ACTIVE_STATUSES),
+        Booking.service_date < end,
+        Booking.service_end > start,
+    )
+
+
+def provider_busy(provider_id, start, end):
+    # Correlates with the outer query when given ServiceProvider.id; served
+    # by ix_bookings_provider_slot, which starts at the bookings still running
+    return db.exists().where(Booking.provider_id == provider_id, overlaps(start, end))
+
+
+def find_conflict(provider_id, start, end, exclude_id=None):
+    query = db.session.query(Booking.id).filter(
+        Booking.provider_id == provider_id,
+        overlaps(start, end),
+    )
+    if exclude_id is not None:
+        query = query.filter(Booking.id != exclude_id)
+    return query.limit(1).scalar()
+
+
+@contextmanager
+def slot_guard(provider_id):
+    """Hold ``provider_id``'s schedule from the conflict check to the commit.
+
+    PostgreSQL takes a transaction-scoped advisory lock, so the check and the
+    insert are atomic across workers, and the exclusion constraint backs it
+    up. Other backends fall back to a lock in this process. The caller must
+    commit inside the block.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(
+            text("SELECT pg_advisory_xact_lock(:key, :provider_id)"),
+            {'key': _LOCK_KEY, 'provider_id': provider_id}
+        )
+        local_lock = None
+    else:
+        local_lock = _local_locks[provider_id % len(_local_locks)]
+        local_lock.acquire()
+
+    try:
+        yield
+    except IntegrityError as e:
+        if SLOT_CONSTRAINT not in str(e.orig):
+            raise
+        db.session.rollback()
+        raise SlotConflict('Provider is already booked for that time') from e
+    finally:
+        if local_lock is not None:
+            local_lock.release()
+
+
+def check_slot(provider_id, start, end, exclude_id=None):
+    if find_conflict(provider_id, start, end, exclude_id) is not None:
+        raise SlotConflict('Provider is already booked for that time')
+
+
+@event.listens_for(Booking.service_date, 'set')
+def _keep_end_on_date(target, value, oldvalue, initiator):
+    if value is not None:
+        target.service_end = booking_end(value, target.service_duration)
+
+
+@event.listens_for(Booking.service_duration, 'set')
+def _keep_end_on_duration(target, value, oldvalue, initiator):
+    if target.service_date is not None:
+        target.service_end = booking_end(target.service_date, value)
+
+
+def install_slot_constraint(connection):
+    """Backfill service_end and, on PostgreSQL, add the exclusion constraint.
+
+    Returns the number of bookings whose end had to be filled in.
+    """
+    missing = connection.execute(
+        db.select(Booking.id, Booking.service_date, Booking.service_duration)
+        .where(Booking.service_end.is_(None))
+    ).all()
+    if missing:
+        connection.execute(
+            Booking.__table__.update()
+            .where(Booking.id == db.bindparam('booking_id'))
+            .values(service_end=db.bindparam('end')),
+            [{'booking_id': row.id, 'end': booking_end(row.service_date, row.service_duration)}
+             for row in missing]
+        )
+
+    if connection.dialect.name == 'postgresql':
+        exists = connection.execute(
+            text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {'name': SLOT_CONSTRAINT}
+        ).scalar()
+        if not exists:
+            try:
+                connection.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+            except ProgrammingError as e:
+                raise RuntimeError(
+                    'The booking slot constraint needs the btree_gist extension, which only a '
+                    'superuser can create: run "CREATE EXTENSION btree_gist" as one first'
+                ) from e
+            connection.execute(text(_PG_CONSTRAINT))
+    return len(missing)
+
+
+@event.listens_for(Booking.__table__, 'after_create')
+def _create_slot_constraint(target, connection, **kw):
+    if connection.dialect.name == 'postgresql':
+        install_slot_constraint(connection)
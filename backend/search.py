@@ -0,0 +1,167 @@
+import re
+
+from sqlalchemy import DDL, Float, Integer, bindparam, event, false, func, inspect, or_, text
+from sqlalchemy.orm import Session
+from extensions import db
+from models import ServiceProvider, User
+
+# Text search configuration used for both the stored tsvector and the query
+TS_CONFIG = 'english'
+
+# Attributes that feed the search document
+SEARCH_FIELDS = ('service_title', 'description', 'specialties', 'user_id')
+
+_PG_REFRESH = text(f"""
+    UPDATE service_providers AS sp SET search_vector =
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(sp.service_title, '')), 'A') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(u.name, '')), 'A') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(sp.specialties::text, '')), 'B') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(sp.description, '')), 'C')
+    FROM users AS u
+    WHERE u.id = sp.user_id AND sp.id IN :ids
+""").bindparams(bindparam('ids', expanding=True))
+
+_FTS_DELETE = text(
+    "DELETE FROM provider_search WHERE rowid IN :ids"
+).bindparams(bindparam('ids', expanding=True))
+
+_FTS_INSERT = text("""
+    INSERT INTO provider_search (rowid, service_title, name, specialties, description)
+    SELECT sp.id, sp.service_title, u.name, coalesce(sp.specialties, ''), sp.description
+    FROM service_providers AS sp JOIN users AS u ON u.id = sp.user_id
+    WHERE sp.id IN :ids
+""").bindparams(bindparam('ids', expanding=True))
+
+_FTS_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS provider_search USING fts5("
+    "service_title, name, specialties, description, tokenize='porter unicode61')"
+)
+
+# Column weights for bm25(), in provider_search column order
+_FTS_RANK = "-bm25(provider_search, 10.0, 10.0, 4.0, 1.0)"
+
+# SQLite has no tsvector, so the index lives in an FTS5 table whose rowid is
+# the provider id
+event.listen(
+    ServiceProvider.__table__,
+    'after_create',
+    DDL(_FTS_CREATE).execute_if(dialect='sqlite')
+)
+event.listen(
+    ServiceProvider.__table__,
+    'before_drop',
+    DDL("DROP TABLE IF EXISTS provider_search").execute_if(dialect='sqlite')
+)
+
+
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def refresh_search_index(connection, provider_ids):
+    if not provider_ids:
+        return
+    ids = sorted(provider_ids)
+    if connection.dialect.name == 'postgresql':
+        connection.execute(_PG_REFRESH, {'ids': ids})
+    elif connection.dialect.name == 'sqlite':
+        connection.execute(_FTS_DELETE, {'ids': ids})
+        connection.execute(_FTS_INSERT, {'ids': ids})
+
+
+@event.listens_for(Session, 'after_flush')
+def _reindex_providers(session, flush_context):
+    provider_ids = set()
+    user_ids = set()
+    removed_ids = set()
+
+    for obj in session.new:
+        if isinstance(obj, ServiceProvider):
+            provider_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, ServiceProvider) and _changed(obj, SEARCH_FIELDS):
+            provider_ids.add(obj.id)
+        elif isinstance(obj, User) and _changed(obj, ('name',)):
+            user_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, ServiceProvider):
+            removed_ids.add(obj.id)
+
+    if not (provider_ids or user_ids or removed_ids):
+        return
+
+    connection = session.connection()
+    if user_ids:
+        provider_ids.update(connection.scalars(
+            db.select(ServiceProvider.id).where(ServiceProvider.user_id.in_(user_ids))
+        ))
+    refresh_search_index(connection, provider_ids - removed_ids)
+    if removed_ids and connection.dialect.name == 'sqlite':
+        connection.execute(_FTS_DELETE, {'ids': sorted(removed_ids)})
+
+
+def _fts_match(term):
+    # Quote every word so user input can't inject FTS5 query syntax, and
+    # prefix-match the words so partial typing still finds results
+    words = re.findall(r'\w+', term)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_providers(query, term, dialect=None):
+    """Restrict a provider query to full-text matches for ``term``.
+
+    Returns the filtered query and a relevance expression to order by
+    (higher is better), or ``None`` when the backend has no search index.
+    ``dialect`` defaults to that of the Flask-SQLAlchemy session.
+    """
+    dialect = dialect or db.session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        ts_query = func.websearch_to_tsquery(TS_CONFIG, term)
+        query = query.filter(ServiceProvider.search_vector.op('@@')(ts_query))
+        return query, func.ts_rank(ServiceProvider.search_vector, ts_query)
+
+    if dialect == 'sqlite':
+        match = _fts_match(term)
+        if not match:
+            # Nothing searchable (e.g. only punctuation) matches nothing, as
+            # an empty tsquery does on PostgreSQL
+            return query.filter(false()), None
+        hits = text(
+            f"SELECT rowid AS provider_id, {_FTS_RANK} AS relevance "
+            "FROM provider_search WHERE provider_search MATCH :match"
+        ).bindparams(match=match).columns(provider_id=Integer, relevance=Float).subquery('search_hits')
+        query = query.join(hits, hits.c.provider_id == ServiceProvider.id)
+        return query, hits.c.relevance
+
+    # No index available: fall back to substring matching
+    query = query.join(User, User.id == ServiceProvider.user_id).filter(
+        or_(
+            ServiceProvider.service_title.ilike(f'%{term}%'),
+            ServiceProvider.description.ilike(f'%{term}%'),
+            User.name.ilike(f'%{term}%')
+        )
+    )
+    return query, None
+
+
+def rebuild_search_index():
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            "ALTER TABLE service_providers ADD COLUMN IF NOT EXISTS search_vector tsvector"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_service_providers_search_vector "
+            "ON service_providers USING gin (search_vector)"
+        ))
+    elif connection.dialect.name == 'sqlite':
+        connection.execute(text(_FTS_CREATE))
+        connection.execute(text("DELETE FROM provider_search"))
+
+    provider_ids = connection.scalars(db.select(ServiceProvider.id)).all()
+    refresh_search_index(connection, provider_ids)
+    db.session.commit()
+    return len(provider_ids)
+
@@ -1,142 +1,569 @@
-from app import app
-from models import db, User, ServiceCategory, ServiceProvider, Booking, Review, UserType, BookingStatus
-from werkzeug.security import generate_password_hash
-from datetime import datetime
+#!/usr/bin/env python3
+"""Seed or bulk-load the database.
 
-def seed_database():
-    with app.app_context():
-        db.create_all()
+    python seed_data.py                         # small demo dataset
+    python seed_data.py --import-dir data/      # {categories,users,providers,bookings,reviews}.{csv,ndjson}
+    python seed_data.py --generate --providers 50000 --bookings 1000000 --reviews 1000000
 
-        # ----- Service Categories -----
-        categories_data = [
-            {
-                'name': 'Cooking',
-                'description': 'Home-cooked meals by skilled women',
-                'icon': 'fa-utensils'
-            },
-            {
-                'name': 'Cleaning',
-                'description': 'Professional home and office cleaning',
-                'icon': 'fa-broom'
-            }
-        ]
-        categories = []
-        for cat_data in categories_data:
-            category = ServiceCategory.query.filter_by(name=cat_data['name']).first()
-            if not category:
-                category = ServiceCategory(**cat_data)
-                db.session.add(category)
-            categories.append(category)
-
-        # ----- Users -----
-        users_data = [
-            {
-                'name': 'Ayesha Khan',
-                'email': 'ayesha@gmail.com',
-                'phone': '03001234567',
-                'user_type': UserType.CUSTOMER,
-                'location': 'Lahore',
-                'password': 'password123'
-            },
-            {
-                'name': 'Sara Malik',
-                'email': 'sara.provider@gmail.com',
-                'phone': '03007654321',
-                'user_type': UserType.PROVIDER,
-                'location': 'Karachi',
-                'password': 'password123'
-            },
-            {
-                'name': 'Admin User',
-                'email': 'admin@gharkakaam.pk',
-                'phone': '03009998888',
-                'user_type': UserType.ADMIN,
-                'location': 'Islamabad',
-                'password': 'admin123'
-            }
-        ]
-        users = []
-        for user_data in users_data:
-            user = User.query.filter_by(email=user_data['email']).first()
-            if not user:
-                user = User(
-                    name=user_data['name'],
-                    email=user_data['email'],
-                    phone=user_data['phone'],
-                    user_type=user_data['user_type'],
-                    location=user_data['location'],
-                    is_verified=True,
-                    is_active=True
-                )
-                user.set_password(user_data['password'])
-                db.session.add(user)
-            users.append(user)
-
-        db.session.commit()  # Commit now to get user and category IDs
-
-        # ----- Service Provider -----
-        provider_user = User.query.filter_by(email='sara.provider@gmail.com').first()
-        cooking_category = ServiceCategory.query.filter_by(name='Cooking').first()
-        if provider_user and cooking_category:
-            if not ServiceProvider.query.filter_by(user_id=provider_user.id).first():
-                provider = ServiceProvider(
-                    user_id=provider_user.id,
-                    category_id=cooking_category.id,
-                    service_title='Tiffin Service Expert',
-                    description='Delicious Pakistani meals for lunch and dinner',
-                    specialties=["Pakistani", "Vegetarian", "Tandoori"],
-                    experience_years=4,
-                    price_range_min=500.00,
-                    price_range_max=1500.00,
-                    price_unit='per meal',
-                    availability={"mon_fri": "9am-5pm"},
-                    service_area='Karachi',
-                    rating=4.5,
-                    total_reviews=10,
-                    total_bookings=20,
-                    is_approved=True,
-                    is_active=True,
-                    verification_documents=["cnic.jpg", "certificate.jpg"]
-                )
-                db.session.add(provider)
-                db.session.commit()
-
-        # ----- Booking -----
-        customer_user = User.query.filter_by(email='ayesha@gmail.com').first()
-        provider = ServiceProvider.query.filter_by(user_id=provider_user.id).first()
-
-        if customer_user and provider:
-            if not Booking.query.first():
-                booking = Booking(
-                    customer_id=customer_user.id,
-                    provider_id=provider.id,
-                    service_date=datetime(2025, 6, 20, 14, 0),
-                    service_duration=90,
-                    service_address='House #12, Gulshan-e-Iqbal, Karachi',
-                    special_requirements='Less spicy food',
-                    estimated_price=1000.00,
-                    final_price=1100.00,
-                    status=BookingStatus.COMPLETED,
-                    payment_status='paid',
-                    notes='Customer was happy with the meal.'
-                )
-                db.session.add(booking)
-                db.session.commit()
-
-                # ----- Review -----
-                review = Review(
-                    booking_id=booking.id,
-                    customer_id=customer_user.id,
-                    provider_id=provider.id,
-                    rating=5,
-                    comment='Absolutely delicious and on time! Highly recommended.',
-                    is_verified=True
+Records are streamed and written in chunks (Postgres COPY when available,
+otherwise multi-row INSERTs), so row data is never held in memory. Foreign
+keys given as natural keys (user e-mail, category name, booking ref) are
+resolved from small in-memory id maps.
+"""
+import argparse
+import csv
+import enum
+import io
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+from sqlalchemy import select, text
+
+from models import (
+    db, User, ServiceCategory, ServiceProvider, ProviderServiceArea, Booking, Review,
+    UserType, BookingStatus, parse_service_areas
+)
+from scheduling import booking_end
+from geo import encode as encode_geohash
+from extensions import password_hasher
+
+CHUNK_SIZE = 5000
+ENTITIES = ('categories', 'users', 'providers', 'bookings', 'reviews')
+
+
+@lru_cache(maxsize=256)
+def _hash_password(password):
+    # Imports and generated data tend to reuse a handful of passwords
+    return password_hasher.hash(password)
+
+
+def _truthy(value):
+    return str(value).strip().lower() in ('1', 'true', 't', 'yes', 'y')
+
+
+def _converter(column):
+    # CSV gives strings for everything and NDJSON may too (enums, dates), so
+    # each column gets one converter for string input, built once per table
+    column_type = column.type
+    if isinstance(column_type, db.Enum):
+        enum_class = column_type.enum_class
+        return lambda value: value if isinstance(value, enum.Enum) else enum_class(value)
+    if isinstance(column_type, db.String):
+        return None
+    if isinstance(column_type, db.JSON):
+        parse = json.loads
+    else:
+        python_type = column_type.python_type
+        if python_type is bool:
+            parse = _truthy
+        elif python_type is datetime:
+            parse = lambda value: datetime.fromisoformat(value.replace('Z', '+00:00'))  # noqa: E731
+        elif python_type in (int, Decimal):
+            parse = python_type
+        else:
+            return None
+    return lambda value: (parse(value) if value != '' else None) if isinstance(value, str) else value
+
+
+def _default(column):
+    default = column.default
+    if default is None:
+        return lambda: None
+    if default.is_callable:
+        return lambda: default.arg(None)
+    return lambda: default.arg
+
+
+@lru_cache(maxsize=None)
+def _column_plan(table):
+    return [
+        (column.key, _converter(column), _default(column))
+        for column in table.columns
+        if column.key != 'search_vector'
+    ]
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, enum.Enum):
+        # SQLAlchemy stores Enum members by name
+        return value.name
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def read_records(path):
+    """Stream dicts from a .csv or .ndjson/.jsonl file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class BulkLoader:
+    """Chunked loader for the core tables.
+
+    Ids are assigned here (or taken from the records), so inserted rows never
+    need to be read back to resolve the foreign keys of later records.
+    """
+
+    def __init__(self, connection, chunk_size=CHUNK_SIZE, use_copy=None):
+        self.connection = connection
+        self.chunk_size = chunk_size
+        self.use_copy = connection.dialect.name == 'postgresql' if use_copy is None else use_copy
+        self.counts = {}
+        self._next_ids = {}
+        self._category_ids = dict(connection.execute(select(ServiceCategory.name, ServiceCategory.id)).all())
+        self._user_ids = dict(connection.execute(select(User.email, User.id)).all())
+        self._provider_ids = dict(connection.execute(
+            select(User.email, ServiceProvider.id).join(User, User.id == ServiceProvider.user_id)
+        ).all())
+        self._booking_refs = {}
+
+    # -- writing -------------------------------------------------------------
+
+    def _next_id(self, table, record_id=None):
+        if table.name not in self._next_ids:
+            current = self.connection.execute(text(f'SELECT max(id) FROM {table.name}')).scalar()
+            self._next_ids[table.name] = (current or 0) + 1
+        if record_id is None:
+            record_id = self._next_ids[table.name]
+        self._next_ids[table.name] = max(self._next_ids[table.name], record_id + 1)
+        return record_id
+
+    def _row(self, table, record):
+        row = {}
+        for key, convert, default in _column_plan(table):
+            if key in record:
+                value = record[key]
+                row[key] = convert(value) if convert is not None and value is not None else value
+            else:
+                row[key] = default()
+        row['id'] = self._next_id(table, row['id'])
+        return row
+
+    def _write(self, table, rows):
+        if not rows:
+            return
+        if self.use_copy:
+            columns = list(rows[0])
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([_copy_value(row[column]) for column in columns])
+            buffer.seek(0)
+            cursor = self.connection.connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                    buffer
                 )
-                db.session.add(review)
+            finally:
+                cursor.close()
+        else:
+            self.connection.execute(table.insert(), rows)
+        self.counts[table.name] = self.counts.get(table.name, 0) + len(rows)
+
+    def _stream(self, table, records, prepare, extra=None):
+        chunk, extra_chunk = [], []
+        for record in records:
+            row = prepare(record)
+            if row is None:
+                continue
+            chunk.append(row)
+            if extra is not None:
+                extra_chunk.extend(extra(row))
+            if len(chunk) >= self.chunk_size:
+                self._write(table, chunk)
+                if extra is not None:
+                    self._write(extra.table, extra_chunk)
+                chunk, extra_chunk = [], []
+        self._write(table, chunk)
+        if extra is not None:
+            self._write(extra.table, extra_chunk)
+
+    # -- foreign keys --------------------------------------------------------
+
+    def _resolve(self, record, id_key, natural_key, mapping, label):
+        if record.get(id_key) not in (None, ''):
+            return record[id_key]
+        try:
+            return mapping[record[natural_key]]
+        except KeyError:
+            raise ValueError(f'Unknown {label} {record.get(natural_key)!r}') from None
+
+    # -- entities ------------------------------------------------------------
+
+    def categories(self, records):
+        def prepare(record):
+            if record['name'] in self._category_ids:
+                return None
+            row = self._row(ServiceCategory.__table__, record)
+            self._category_ids[row['name']] = row['id']
+            return row
+        self._stream(ServiceCategory.__table__, records, prepare)
+
+    def users(self, records):
+        def prepare(record):
+            if record['email'] in self._user_ids:
+                return None
+            record = dict(record)
+            if record.get('password') and not record.get('password_hash'):
+                record['password_hash'] = _hash_password(record.pop('password'))
+            row = self._row(User.__table__, record)
+            self._user_ids[row['email']] = row['id']
+            return row
+        self._stream(User.__table__, records, prepare)
+
+    def providers(self, records):
+        area_table = ProviderServiceArea.__table__
 
+        def prepare(record):
+            if record.get('user_email') in self._provider_ids:
+                return None
+            record = dict(record)
+            record['user_id'] = self._resolve(record, 'user_id', 'user_email', self._user_ids, 'user')
+            record['category_id'] = self._resolve(
+                record, 'category_id', 'category', self._category_ids, 'category'
+            )
+            row = self._row(ServiceProvider.__table__, record)
+            if row.get('latitude') is not None and row.get('longitude') is not None:
+                # What geo.py's attribute listeners would have set
+                row['geohash'] = encode_geohash(row['latitude'], row['longitude'])
+            if record.get('user_email'):
+                self._provider_ids[record['user_email']] = row['id']
+            return row
+
+        def service_areas(row):
+            # Rows the ServiceProvider.service_area validator would have made
+            return [
+                {'id': self._next_id(area_table), 'provider_id': row['id'], 'area': area}
+                for area in parse_service_areas(row['service_area'])
+            ]
+        service_areas.table = area_table
+
+        self._stream(ServiceProvider.__table__, records, prepare, extra=service_areas)
+
+    def bookings(self, records):
+        def prepare(record):
+            record = dict(record)
+            record['customer_id'] = self._resolve(
+                record, 'customer_id', 'customer_email', self._user_ids, 'customer'
+            )
+            record['provider_id'] = self._resolve(
+                record, 'provider_id', 'provider_email', self._provider_ids, 'provider'
+            )
+            row = self._row(Booking.__table__, record)
+            if row['service_end'] is None and row['service_date'] is not None:
+                row['service_end'] = booking_end(row['service_date'], row['service_duration'])
+            # Only bookings that reviews need to point at are remembered
+            if record.get('ref'):
+                self._booking_refs[record['ref']] = row['id']
+            return row
+        self._stream(Booking.__table__, records, prepare)
+
+    def reviews(self, records):
+        def prepare(record):
+            record = dict(record)
+            record['booking_id'] = self._resolve(
+                record, 'booking_id', 'booking_ref', self._booking_refs, 'booking'
+            )
+            record['customer_id'] = self._resolve(
+                record, 'customer_id', 'customer_email', self._user_ids, 'customer'
+            )
+            record['provider_id'] = self._resolve(
+                record, 'provider_id', 'provider_email', self._provider_ids, 'provider'
+            )
+            return self._row(Review.__table__, record)
+        self._stream(Review.__table__, records, prepare)
+
+    def finish(self):
+        """Bring sequences and derived columns up to date after a load."""
+        if self.connection.dialect.name == 'postgresql':
+            for table in self._next_ids:
+                self.connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"coalesce((SELECT max(id) FROM {table}), 0) + 1, false)"
+                ))
         db.session.commit()
-        print("✅ Database seeded successfully!")
+
+        # Bulk writes skip the ORM hooks that maintain these
+        from ratings import rebuild_ratings
+        from search import rebuild_search_index
+        from stats import rebuild_booking_stats
+        from ranking import rebuild_scores
+        if self.counts.get('reviews'):
+            rebuild_ratings()
+        if self.counts.get('service_providers') or self.counts.get('bookings') or self.counts.get('reviews'):
+            # Completed/cancelled counts, recency and the ranking score
+            rebuild_scores()
+        if self.counts.get('bookings'):
+            rebuild_booking_stats()
+        if self.counts.get('service_providers') or self.counts.get('users'):
+            rebuild_search_index()
+
+
+# -- synthetic data ----------------------------------------------------------
+
+CATEGORIES = [
+    ('Cooking', 'fa-utensils'), ('Cleaning', 'fa-broom'), ('Tailoring', 'fa-cut'),
+    ('Tutoring', 'fa-book'), ('Beauty', 'fa-spa'), ('Childcare', 'fa-baby'),
+    ('Laundry', 'fa-tshirt'), ('Gardening', 'fa-seedling'),
+]
+CITIES = [
+    'Lahore', 'Karachi', 'Islamabad', 'Rawalpindi', 'Faisalabad', 'Multan',
+    'Peshawar', 'Quetta', 'Sialkot', 'Hyderabad', 'Gujranwala', 'Bahawalpur',
+]
+CITY_COORDINATES = {
+    'Lahore': (31.5204, 74.3587), 'Karachi': (24.8607, 67.0011), 'Islamabad': (33.6844, 73.0479),
+    'Rawalpindi': (33.5651, 73.0169), 'Faisalabad': (31.4504, 73.1350), 'Multan': (30.1575, 71.5249),
+    'Peshawar': (34.0151, 71.5249), 'Quetta': (30.1798, 66.9750), 'Sialkot': (32.4945, 74.5229),
+    'Hyderabad': (25.3960, 68.3578), 'Gujranwala': (32.1877, 74.1945), 'Bahawalpur': (29.3544, 71.6911),
+}
+SPECIALTIES = [
+    'Pakistani', 'Continental', 'Chinese', 'Baking', 'Biryani', 'Karahi', 'Deep cleaning',
+    'Embroidery', 'Mathematics', 'Bridal makeup', 'Ironing', 'Landscaping', 'Tandoori',
+]
+WORDS = [
+    'home', 'fresh', 'reliable', 'experienced', 'family', 'weekly', 'daily', 'premium',
+    'affordable', 'quick', 'healthy', 'traditional', 'modern', 'careful', 'trusted',
+]
+STATUS_WEIGHTS = [
+    (BookingStatus.PENDING, 15), (BookingStatus.CONFIRMED, 10), (BookingStatus.IN_PROGRESS, 5),
+    (BookingStatus.COMPLETED, 60), (BookingStatus.CANCELLED, 10),
+]
+
+
+def synthetic_records(providers, bookings, reviews, customers=None, spare_providers=None,
+                      password='password123', seed=42):
+    """Deterministic synthetic records for every table, as generators.
+
+    Each booking's parties are a pure function of its id, so reviews can
+    point at consistent bookings without remembering them. Ids are relative
+    to an empty database.
+    """
+    customers = customers or max(providers * 4, 100)
+    spare_providers = max(providers // 10, 50) if spare_providers is None else spare_providers
+    now = datetime(2026, 1, 1)
+    first_customer = 2
+    first_provider_user = first_customer + customers
+    total_users = first_provider_user + providers + spare_providers - 1
+    # Reviews cover the first 60% of bookings, which are completed
+    reviewed = min(reviews, int(bookings * 0.6))
+
+    def sentence(rng, n):
+        return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+    def booking_parties(booking_id):
+        return (first_customer + (booking_id * 7919) % customers,
+                1 + (booking_id * 104729) % providers)
+
+    def category_records():
+        for i, (name, icon) in enumerate(CATEGORIES):
+            yield {'id': i + 1, 'name': name, 'description': f'{name} services', 'icon': icon,
+                   'created_at': now}
+
+    def user_records():
+        rng = random.Random(seed)
+        for user_id in range(1, total_users + 1):
+            if user_id == 1:
+                user_type = UserType.ADMIN
+            elif user_id < first_provider_user:
+                user_type = UserType.CUSTOMER
+            else:
+                user_type = UserType.PROVIDER
+            yield {
+                'id': user_id, 'name': f'User {user_id}', 'email': f'user{user_id}@example.com',
+                'phone': f'03{user_id:09d}', 'password': password, 'user_type': user_type,
+                'location': rng.choice(CITIES), 'is_verified': True,
+                'created_at': now - timedelta(minutes=user_id), 'updated_at': now,
+            }
+
+    def provider_records():
+        rng = random.Random(seed + 1)
+        # Positions get their own stream so the other columns stay as before
+        geo_rng = random.Random(seed + 4)
+        for provider_id in range(1, providers + 1):
+            record = {
+                'id': provider_id, 'user_id': first_provider_user + provider_id - 1,
+                'category_id': rng.randint(1, len(CATEGORIES)),
+                'service_title': f'{sentence(rng, 2).title()} {rng.choice(SPECIALTIES)}',
+                'description': sentence(rng, 20), 'specialties': rng.sample(SPECIALTIES, 3),
+                'experience_years': rng.randint(0, 25), 'price_range_min': rng.randint(3, 10) * 100,
+                'price_range_max': rng.randint(11, 40) * 100, 'price_unit': 'per visit',
+                'availability': {'mon_fri': '9am-5pm'},
+                'service_area': ', '.join(rng.sample(CITIES, rng.randint(1, 3))),
+                'is_approved': rng.random() < 0.9, 'verification_documents': [],
+                'created_at': now - timedelta(hours=provider_id), 'updated_at': now,
+            }
+            # Somewhere in the first city served
+            latitude, longitude = CITY_COORDINATES[record['service_area'].split(', ')[0]]
+            record['latitude'] = latitude + geo_rng.uniform(-0.1, 0.1)
+            record['longitude'] = longitude + geo_rng.uniform(-0.1, 0.1)
+            record['service_radius_km'] = geo_rng.choice([None, 5, 10, 25])
+            yield record
+
+    def booking_records():
+        rng = random.Random(seed + 2)
+        statuses = [status for status, _ in STATUS_WEIGHTS]
+        weights = [weight for _, weight in STATUS_WEIGHTS]
+        # Each provider's bookings take successive three-hour slots, four a
+        # day, so active bookings never overlap
+        slots = {}
+        for booking_id in range(1, bookings + 1):
+            customer_id, provider_id = booking_parties(booking_id)
+            slot = slots[provider_id] = slots.get(provider_id, -1) + 1
+            status = BookingStatus.COMPLETED if booking_id <= reviewed else rng.choices(statuses, weights)[0]
+            created_at = now - timedelta(minutes=bookings - booking_id)
+            completed = status == BookingStatus.COMPLETED
+            yield {
+                'id': booking_id, 'customer_id': customer_id, 'provider_id': provider_id,
+                'service_date': now + timedelta(days=slot // 4, hours=8 + 3 * (slot % 4)),
+                'service_duration': rng.choice([60, 90, 120, 180]),
+                'service_address': f'House {booking_id}, {rng.choice(CITIES)}',
+                'special_requirements': '', 'estimated_price': rng.randint(5, 30) * 100,
+                'final_price': rng.randint(5, 30) * 100 if completed else None,
+                'status': status, 'payment_status': 'paid' if completed else 'pending',
+                'created_at': created_at, 'updated_at': created_at,
+            }
+
+    def review_records():
+        rng = random.Random(seed + 3)
+        for review_id in range(1, (reviews if reviewed else 0) + 1):
+            booking_id = (review_id - 1) % reviewed + 1
+            customer_id, provider_id = booking_parties(booking_id)
+            yield {
+                'id': review_id, 'booking_id': booking_id, 'customer_id': customer_id,
+                'provider_id': provider_id, 'rating': rng.choices([1, 2, 3, 4, 5], [1, 1, 3, 8, 12])[0],
+                'comment': sentence(rng, 8), 'is_verified': True,
+                'created_at': now - timedelta(minutes=reviews - review_id),
+            }
+
+    return {
+        'categories': category_records(),
+        'users': user_records(),
+        'providers': provider_records(),
+        'bookings': booking_records(),
+        'reviews': review_records(),
+    }
+
+
+def load_records(records, log=print, **loader_options):
+    """Load ``{entity: iterable of records}`` in dependency order."""
+    loader = BulkLoader(db.session.connection(), **loader_options)
+    for entity in ENTITIES:
+        if entity in records:
+            getattr(loader, entity)(records[entity])
+            log(f'{entity}: loaded')
+    loader.finish()
+    return loader.counts
+
+
+def import_dir(path, log=print):
+    records = {}
+    for entity in ENTITIES:
+        for extension in ('.csv', '.ndjson', '.jsonl'):
+            file_path = os.path.join(path, entity + extension)
+            if os.path.exists(file_path):
+                records[entity] = read_records(file_path)
+                break
+    return load_records(records, log=log)
+
+
+# -- demo data ---------------------------------------------------------------
+
+DEMO_RECORDS = {
+    'categories': [
+        {'name': 'Cooking', 'description': 'Home-cooked meals by skilled women', 'icon': 'fa-utensils'},
+        {'name': 'Cleaning', 'description': 'Professional home and office cleaning', 'icon': 'fa-broom'},
+    ],
+    'users': [
+        {'name': 'Ayesha Khan', 'email': 'ayesha@gmail.com', 'phone': '03001234567',
+         'user_type': UserType.CUSTOMER, 'location': 'Lahore', 'password': 'password123',
+         'is_verified': True, 'is_active': True},
+        {'name': 'Sara Malik', 'email': 'sara.provider@gmail.com', 'phone': '03007654321',
+         'user_type': UserType.PROVIDER, 'location': 'Karachi', 'password': 'password123',
+         'is_verified': True, 'is_active': True},
+        {'name': 'Admin User', 'email': 'admin@gharkakaam.pk', 'phone': '03009998888',
+         'user_type': UserType.ADMIN, 'location': 'Islamabad', 'password': 'admin123',
+         'is_verified': True, 'is_active': True},
+    ],
+    'providers': [
+        {'user_email': 'sara.provider@gmail.com', 'category': 'Cooking',
+         'service_title': 'Tiffin Service Expert',
+         'description': 'Delicious Pakistani meals for lunch and dinner',
+         'specialties': ["Pakistani", "Vegetarian", "Tandoori"], 'experience_years': 4,
+         'price_range_min': 500.00, 'price_range_max': 1500.00, 'price_unit': 'per meal',
+         'availability': {"mon_fri": "9am-5pm"}, 'service_area': 'Karachi',
+         'is_approved': True, 'is_active': True,
+         'verification_documents': ["cnic.jpg", "certificate.jpg"]},
+    ],
+    'bookings': [
+        {'ref': 'demo-booking', 'customer_email': 'ayesha@gmail.com',
+         'provider_email': 'sara.provider@gmail.com', 'service_date': datetime(2025, 6, 20, 14, 0),
+         'service_duration': 90, 'service_address': 'House #12, Gulshan-e-Iqbal, Karachi',
+         'special_requirements': 'Less spicy food', 'estimated_price': 1000.00,
+         'final_price': 1100.00, 'status': BookingStatus.COMPLETED, 'payment_status': 'paid',
+         'notes': 'Customer was happy with the meal.'},
+    ],
+    'reviews': [
+        {'booking_ref': 'demo-booking', 'customer_email': 'ayesha@gmail.com',
+         'provider_email': 'sara.provider@gmail.com', 'rating': 5,
+         'comment': 'Absolutely delicious and on time! Highly recommended.', 'is_verified': True},
+    ],
+}
+
+
+def seed_database():
+    records = dict(DEMO_RECORDS)
+    # Bookings have no natural key, so only seed them into an empty table
+    if db.session.query(Booking.id).first():
+        records.pop('bookings')
+        records.pop('reviews')
+    load_records(records, log=lambda step: None)
+    print("✅ Database seeded successfully!")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed or bulk-load the database.')
+    parser.add_argument('--import-dir', help='directory of <entity>.csv / <entity>.ndjson files')
+    parser.add_argument('--generate', action='store_true', help='load a synthetic dataset')
+    parser.add_argument('--providers', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=10000)
+    parser.add_argument('--reviews', type=int, default=20000)
+    parser.add_argument('--customers', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        if args.import_dir:
+            counts = import_dir(args.import_dir)
+        elif args.generate:
+            counts = load_records(synthetic_records(
+                args.providers, args.bookings, args.reviews, args.customers, seed=args.seed
+            ))
+        else:
+            seed_database()
+            return
+        print(f"✅ Loaded {counts}")
 
 
 if __name__ == '__main__':
-    seed_database()
+    main()
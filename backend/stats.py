@@ -0,0 +1,137 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Booking, BookingStatus, ProviderDailyStats
+
+STATUS_COLUMNS = [status.value for status in BookingStatus]
+_STATS = ProviderDailyStats.__table__
+_INSERTS = {'postgresql': pg_insert, 'sqlite': sqlite_insert}
+MAX_PRICE = Decimal('99999999.99')  # Booking.final_price is Numeric(10, 2)
+
+
+def parse_price(value):
+    """Validate a price from a request body; None means "no price"."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError('final_price must be a number')
+    try:
+        price = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError('final_price must be a number')
+    if not price.is_finite() or not 0 <= price <= MAX_PRICE:
+        raise ValueError(f'final_price must be between 0 and {MAX_PRICE}')
+    return price
+
+
+def earned(status, final_price):
+    # What a booking contributes to its day's earnings
+    if status != BookingStatus.COMPLETED or final_price is None:
+        return Decimal(0)
+    return Decimal(str(final_price))
+
+
+def apply_booking_changes(rows):
+    """Fold booking writes into the daily rollups.
+
+    Each row holds a ``provider_id`` and ``day`` plus the change in that
+    day's count per status column and in its ``earnings``. Only those days
+    are touched: each is upserted once, with SQL-side increments, inside the
+    caller's transaction.
+    """
+    rows = [
+        {'earnings': Decimal(0), **{column: 0 for column in STATUS_COLUMNS}, **row}
+        for row in rows
+    ]
+    rows = [row for row in rows if row['earnings'] or any(row[column] for column in STATUS_COLUMNS)]
+    if not rows:
+        return
+
+    insert = _INSERTS[db.session.get_bind().dialect.name](_STATS)
+    columns = STATUS_COLUMNS + ['earnings']
+    db.session.execute(
+        insert.on_conflict_do_update(
+            index_elements=[_STATS.c.provider_id, _STATS.c.day],
+            set_={column: _STATS.c[column] + insert.excluded[column] for column in columns}
+        ),
+        rows
+    )
+
+
+def provider_stats(provider_id, days=30):
+    """All-time totals plus the last ``days`` days of one provider's rollups."""
+    sums = db.session.query(
+        *[func.coalesce(func.sum(_STATS.c[column]), 0) for column in STATUS_COLUMNS],
+        func.coalesce(func.sum(_STATS.c.earnings), 0)
+    ).filter(_STATS.c.provider_id == provider_id).one()
+    *counts, earnings = sums
+    by_status = dict(zip(STATUS_COLUMNS, counts))
+
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    daily = ProviderDailyStats.query.filter(
+        ProviderDailyStats.provider_id == provider_id,
+        ProviderDailyStats.day >= since
+    ).order_by(ProviderDailyStats.day).all()
+
+    return {
+        'total_bookings': sum(by_status.values()),
+        'by_status': by_status,
+        'earnings': float(earnings),
+        'daily': [
+            {
+                'day': row.day.isoformat(),
+                **{column: getattr(row, column) for column in STATUS_COLUMNS},
+                'earnings': float(row.earnings)
+            }
+            for row in daily
+        ]
+    }
+
+
+def recompute_booking_stats(provider_ids=None):
+    """Recompute daily rollups from the bookings table, in the caller's transaction.
+
+    Covers the given providers, or every provider when ``provider_ids`` is
+    None.
+    """
+    day = func.date(Booking.service_date)
+    query = (
+        db.select(Booking.provider_id, day, Booking.status, func.count(Booking.id), func.sum(Booking.final_price))
+        .group_by(Booking.provider_id, day, Booking.status)
+    )
+    reset = _STATS.delete()
+    if provider_ids is not None:
+        query = query.where(Booking.provider_id.in_(provider_ids))
+        reset = reset.where(_STATS.c.provider_id.in_(provider_ids))
+    rows = db.session.execute(query).all()
+
+    stats = {}
+    for provider_id, service_day, status, count, total in rows:
+        if isinstance(service_day, str):
+            # SQLite's date() returns text
+            service_day = date.fromisoformat(service_day)
+        row = stats.get((provider_id, service_day))
+        if row is None:
+            row = stats[(provider_id, service_day)] = {
+                'provider_id': provider_id, 'day': service_day, 'earnings': 0,
+                **{column: 0 for column in STATUS_COLUMNS}
+            }
+        row[status.value] = count
+        if status == BookingStatus.COMPLETED:
+            row['earnings'] = total or 0
+
+    db.session.execute(reset)
+    if stats:
+        db.session.execute(_STATS.insert(), list(stats.values()))
+    return len(stats)
+
+
+def rebuild_booking_stats():
+    # Recompute every provider's rollups from the bookings table
+    count = recompute_booking_stats()
+    db.session.commit()
+    return count
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from extensions import db, identity_cache, response_cache
+
+
+@pytest.fixture
+def app(request, tmp_path):
+    # Parametrize indirectly with 'database' to run jobs through the jobs table
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'JWT_SECRET_KEY': 'test-secret-key-with-enough-bytes-for-hs256',
+        'PASSWORD_HASHER': 'werkzeug',
+        'COMPRESS_ENABLED': False,
+        'JOB_QUEUE': getattr(request, 'param', 'memory'),
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    # The caches are process-wide; start every test cold
+    response_cache.clear()
+    identity_cache.clear()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seeded(app):
+    """A category, a customer and ``PROVIDERS`` approved providers, each with
+    ``BOOKINGS`` completed, reviewed bookings from that customer."""
+    from models import Booking, BookingStatus, Review, ServiceCategory, ServiceProvider, User, UserType
+
+    with app.app_context():
+        category = ServiceCategory(name='Cooking')
+        customer = User(name='Customer', email='customer@example.com', phone='1',
+                        user_type=UserType.CUSTOMER, password_hash='x')
+        db.session.add_all([category, customer])
+        db.session.flush()
+
+        providers = []
+        for i in range(PROVIDERS):
+            user = User(name=f'Provider {i}', email=f'provider{i}@example.com', phone='1',
+                        user_type=UserType.PROVIDER, password_hash='x', location='Lahore')
+            db.session.add(user)
+            db.session.flush()
+            provider = ServiceProvider(user_id=user.id, category_id=category.id, service_title=f'Cook {i}', description='Home cooking',
+                                       service_area='Lahore', is_approved=True, is_active=True)
+            db.session.add(provider)
+            db.session.flush()
+            for j in range(BOOKINGS):
+                booking = Booking(customer_id=customer.id, provider_id=provider.id, service_address='Home',
+                                  service_date=datetime(2026, 1, 1) + timedelta(days=i, hours=j * 2),
+                                  service_duration=60, status=BookingStatus.COMPLETED, final_price=100)
+                db.session.add(booking)
+                db.session.flush()
+                db.session.add(Review(booking_id=booking.id, customer_id=customer.id, provider_id=provider.id,
+                                      rating=j % 5 + 1, is_verified=True))
+            providers.append((user.id, provider.id))
+        db.session.commit()
+        return {'category': category.id, 'customer': customer.id, 'providers': providers}
+
+
+PROVIDERS = 12
+BOOKINGS = 3
+
+
+@pytest.fixture
+def auth(app):
+    def headers(user_id):
+        with app.app_context():
+            return {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+    return headers
+
+
+def _queries_recorded(client):
+    # Sum of http_request_queries over every endpoint, as /api/metrics reports it
+    lines = client.get('/api/metrics').get_data(as_text=True).splitlines()
+    return sum(float(line.rsplit(' ', 1)[1]) for line in lines if line.startswith('http_request_queries_sum'))
+
+
+@pytest.fixture
+def query_count(client):
+    """``response, queries = query_count('/api/...', headers=...)``: make a
+    request and count the SQL statements metrics.py saw it run."""
+    def request(*args, **kwargs):
+        before = _queries_recorded(client)
+        response = client.open(*args, **kwargs)
+        return response, int(_queries_recorded(client) - before)
+    return request
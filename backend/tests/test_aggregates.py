@@ -0,0 +1,189 @@
+"""Provider aggregates kept by the refresh_provider job (aggregates.py)
+agree with a rebuild from the source rows."""
+import pytest
+
+from extensions import db, job_queue
+from models import Booking, ProviderDailyStats, Review, ServiceProvider
+
+
+def _aggregates(app):
+    with app.app_context():
+        providers = db.session.execute(db.select(
+            ServiceProvider.id, ServiceProvider.rating, ServiceProvider.total_reviews, ServiceProvider.rating_sum,
+            *[getattr(ServiceProvider, f'rating_count_{star}') for star in range(1, 6)],
+            ServiceProvider.total_bookings, ServiceProvider.cancelled_bookings, ServiceProvider.score
+        ).order_by(ServiceProvider.id)).all()
+        stats = db.session.execute(
+            db.select(ProviderDailyStats.__table__)
+            .where(ProviderDailyStats.__table__.c.pending + ProviderDailyStats.__table__.c.confirmed
+                   + ProviderDailyStats.__table__.c.in_progress + ProviderDailyStats.__table__.c.completed
+                   + ProviderDailyStats.__table__.c.cancelled > 0)
+            .order_by('provider_id', 'day')
+        ).all()
+        return (
+            [tuple(round(float(value), 6) for value in row) for row in providers],
+            [tuple(row) for row in stats],
+        )
+
+
+def _rebuild(app):
+    from ranking import rebuild_scores
+    from ratings import rebuild_ratings
+    from stats import rebuild_booking_stats
+    with app.app_context():
+        rebuild_ratings()
+        rebuild_booking_stats()
+        rebuild_scores()
+
+
+def _book(client, headers, provider_id, day):
+    response = client.post('/api/bookings/', json={
+        'provider_id': provider_id, 'service_date': f'2027-03-{day:02d}T10:00:00', 'service_address': 'Home'
+    }, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['booking']['id']
+
+
+def _writes(client, seeded, auth):
+    customer = auth(seeded['customer'])
+    provider_user_id, provider_id = seeded['providers'][0]
+    provider = auth(provider_user_id)
+
+    booking_id = _book(client, customer, provider_id, 1)
+    for status in ('confirmed', 'completed'):
+        response = client.put(f'/api/bookings/{booking_id}/status',
+                              json={'status': status, 'final_price': 250}, headers=provider)
+        assert response.status_code == 200
+    response = client.post('/api/reviews/', json={'booking_id': booking_id, 'rating': 5}, headers=customer)
+    assert response.status_code == 201
+    review_id = response.get_json()['review']['id']
+    assert client.put(f'/api/reviews/{review_id}', json={'rating': 2}, headers=customer).status_code == 200
+
+    with client.application.app_context():
+        old_review = Review.query.filter(Review.provider_id == provider_id, Review.id != review_id).first().id
+    assert client.delete(f'/api/reviews/{old_review}', headers=customer).status_code == 200
+
+    ids = [_book(client, customer, provider_id, day) for day in (2, 3)]
+    response = client.post('/api/bookings/status:batch', json={'ids': ids, 'status': 'cancelled'}, headers=provider)
+    assert response.get_json()['updated'] == 2
+    return provider_id
+
+
+@pytest.mark.parametrize('app', ['memory', 'database'], indirect=True)
+def test_jobs_match_rebuild(app, client, seeded, auth, monkeypatch):
+    import ranking
+    # Scores decay with time; hold the clock so the two computations agree
+    today = ranking._today()
+    monkeypatch.setattr(ranking, '_today', lambda: today)
+    _rebuild(app)
+    before = _aggregates(app)
+    _writes(client, seeded, auth)
+    with app.app_context():
+        job_queue.run_pending()
+    after = _aggregates(app)
+    assert after != before
+
+    _rebuild(app)
+    assert _aggregates(app) == after
+
+
+@pytest.mark.parametrize('app', ['database'], indirect=True)
+def test_jobs_wait_for_commit(app, client, seeded, auth):
+    from aggregates import review_changed
+    from models import Job
+
+    _, provider_id = seeded['providers'][0]
+    with app.app_context():
+        review_changed(provider_id, added=5)
+        db.session.rollback()
+        assert Job.query.count() == 0
+
+        review_changed(provider_id, added=5)
+        review_changed(provider_id, added=3)
+        db.session.commit()
+        # Folded into one job per provider
+        jobs = Job.query.all()
+        assert [(job.provider_id, job.payload['reviews']['count']) for job in jobs] == [(provider_id, 2)]
+
+
+@pytest.mark.parametrize('app', ['database'], indirect=True)
+def test_failing_job_only_holds_back_its_provider(app, client, seeded):
+    from aggregates import REFRESH_PROVIDER, review_changed
+    from models import Job
+
+    (_, bad), (_, good), (_, other) = seeded['providers'][:3]
+    with app.app_context():
+        before = {provider_id: db.session.get(ServiceProvider, provider_id).total_reviews for provider_id in (good, other)}
+        review_changed(good, added=5)
+        review_changed(other, added=4)
+        # A star that int() can't parse makes the handler raise
+        db.session.add(Job(kind=REFRESH_PROVIDER, provider_id=bad,
+                           payload={'reviews': {'count': 1, 'sum': 5, 'stars': {'five': 1}}}))
+        db.session.commit()
+
+        job_queue.work()
+        assert [(job.provider_id, job.attempts) for job in Job.query.all()] == [(bad, 1)]
+        for provider_id in (good, other):
+            assert db.session.get(ServiceProvider, provider_id).total_reviews == before[provider_id] + 1
+
+
+@pytest.mark.parametrize('app', ['database'], indirect=True)
+def test_provider_detail_not_cached_until_job_runs(app, client, seeded, auth):
+    customer = auth(seeded['customer'])
+    provider_user_id, provider_id = seeded['providers'][1]
+    booking_id = _book(client, customer, provider_id, 1)
+    with app.app_context():
+        db.session.execute(db.update(Booking).where(Booking.id == booking_id).values(status='COMPLETED'))
+        db.session.commit()
+
+    detail = lambda: client.get(f'/api/services/providers/{provider_id}').get_json()['provider']
+    total_reviews = detail()['total_reviews']
+
+    response = client.post('/api/reviews/', json={'booking_id': booking_id, 'rating': 4}, headers=customer)
+    assert response.status_code == 201
+    assert detail()['total_reviews'] == total_reviews
+
+    with app.app_context():
+        job_queue.run_pending()
+    assert detail()['total_reviews'] == total_reviews + 1
+
+
+def test_new_provider_keeps_recency(app, client, seeded, auth):
+    from models import User, UserType
+
+    with app.app_context():
+        user = User(name='New', email='new@example.com', phone='1', user_type=UserType.PROVIDER, password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    response = client.post('/api/services/providers', json={
+        'category_id': seeded['category'], 'service_title': 'New cook', 'description': 'Fresh'
+    }, headers=auth(user_id))
+    assert response.status_code == 201
+    provider_id = response.get_json()['provider']['id']
+    with app.app_context():
+        db.session.get(ServiceProvider, provider_id).is_approved = True
+        db.session.commit()
+
+    created = _score(app, provider_id)
+    _book(client, auth(seeded['customer']), provider_id, 1)
+    assert _score(app, provider_id) == pytest.approx(created)
+
+    _rebuild(app)
+    assert _score(app, provider_id) == pytest.approx(created, abs=1e-6)
+
+
+def _score(app, provider_id):
+    with app.app_context():
+        return db.session.get(ServiceProvider, provider_id).score
+
+
+def test_reviewed_provider_outranks_new_one():
+    from datetime import datetime, timedelta
+    from ranking import activity_day, new_provider_ranking, score
+
+    now = datetime.utcnow()
+    new = new_provider_ranking(now)['score']
+    # 4.8 stars over 50 reviews and bookings, last active two months ago
+    established = score(4.8 * 50, 50, 50, 2, activity_day(now - timedelta(days=60)), activity_day(now))
+    assert established > new
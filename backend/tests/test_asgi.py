@@ -0,0 +1,38 @@
+import asyncio
+import gzip
+
+import orjson
+
+from asgi import async_database_url, create_read_app
+
+
+def _get(read_app, path, headers=()):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'per_page=50',
+             'headers': [(name.encode(), value.encode()) for name, value in headers]}
+    asyncio.run(read_app(scope, None, send))
+    start, body = messages
+    return start['status'], {name.decode(): value.decode() for name, value in start['headers']}, body['body']
+
+
+def test_conditional_get_and_compression(app, seeded):
+    read_app = create_read_app({
+        'ASYNC_DATABASE_URL': async_database_url(app.config['SQLALCHEMY_DATABASE_URI']),
+        'COMPRESS_MIN_SIZE': 100,
+    })
+    status, headers, body = _get(read_app, '/api/services/providers')
+    assert status == 200 and 'content-encoding' not in headers
+    assert len(orjson.loads(body)['providers']) == len(seeded['providers'])
+
+    etag = headers['etag']
+    status, _, _ = _get(read_app, '/api/services/providers', [('if-none-match', etag)])
+    assert status == 304
+
+    status, compressed, gzipped = _get(read_app, '/api/services/providers', [('accept-encoding', 'gzip')])
+    assert status == 200 and compressed['content-encoding'] == 'gzip'
+    assert gzip.decompress(gzipped) == body
+    assert compressed['etag'] == 'W/' + etag
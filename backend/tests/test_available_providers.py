@@ -0,0 +1,41 @@
+def test_available_providers(seeded, client):
+    # Provider 0 is booked 2026-01-01 00:00-01:00 (see conftest.seeded), but
+    # completed bookings free their slot
+    response = client.get('/api/services/providers/available?start=2026-01-01T00:30:00')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['total'] == len(seeded['providers'])
+    assert 'user' in body['providers'][0]
+
+
+def test_available_providers_excludes_busy(seeded, client):
+    from extensions import db
+    from models import Booking, BookingStatus
+
+    _, provider_id = seeded['providers'][0]
+    with client.application.app_context():
+        db.session.execute(
+            db.update(Booking).where(Booking.provider_id == provider_id).values(status=BookingStatus.CONFIRMED)
+        )
+        db.session.commit()
+
+    ids = lambda response: {provider['id'] for provider in response.get_json()['providers']}
+    busy = client.get('/api/services/providers/available?start=2026-01-01T00:30:00&per_page=50')
+    free = client.get('/api/services/providers/available?start=2026-01-01T05:00:00&per_page=50')
+    assert busy.status_code == free.status_code == 200
+    assert provider_id not in ids(busy)
+    assert provider_id in ids(free)
+
+
+def test_available_providers_fieldset(seeded, client):
+    response = client.get('/api/services/providers/available?start=2030-01-01T10:00:00&fields=id,service_title')
+    assert response.status_code == 200
+    assert set(response.get_json()['providers'][0]) == {'id', 'service_title'}
+
+    response = client.get('/api/services/providers/available?start=2030-01-01T10:00:00&fields=nope')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Unknown field: nope'
+
+
+def test_available_providers_requires_start(client):
+    assert client.get('/api/services/providers/available').status_code == 400
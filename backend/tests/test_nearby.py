@@ -0,0 +1,52 @@
+import pytest
+
+from extensions import db
+from geo import distance_km, squared_distance
+from models import ServiceProvider
+
+LAHORE = (31.5204, 74.3587)
+
+
+def _place(app, seeded):
+    # Provider i sits about i * 3 km north-east of the point; the rest stay unplaced
+    with app.app_context():
+        for i, (_, provider_id) in enumerate(seeded['providers'][:8]):
+            provider = db.session.get(ServiceProvider, provider_id)
+            provider.latitude = LAHORE[0] + i * 0.019
+            provider.longitude = LAHORE[1] + i * 0.022
+        db.session.commit()
+    return [provider_id for _, provider_id in seeded['providers'][:8]]
+
+
+def test_nearby_pages_nearest_first(app, client, seeded):
+    placed = _place(app, seeded)
+    near = f'near={LAHORE[0]},{LAHORE[1]}&radius_km=13'
+
+    first = client.get(f'/api/services/providers?{near}&per_page=2').get_json()
+    second = client.get(f'/api/services/providers?{near}&per_page=2&page=2').get_json()
+    # 0, 3, 6, 9 and 12 km away are within 13 km
+    assert first['total'] == 5 and first['pages'] == 3
+    assert [p['id'] for p in first['providers'] + second['providers']] == placed[:4]
+    assert first['providers'][0]['distance_km'] == 0
+
+
+def test_nearby_facets_cover_nearby_providers_only(app, client, seeded):
+    _place(app, seeded)
+    body = client.get(
+        f'/api/services/providers?near={LAHORE[0]},{LAHORE[1]}&radius_km=13&facets=category'
+    ).get_json()
+    assert body['facets']['category'][0]['count'] == body['total'] == 5
+
+
+@pytest.mark.parametrize('offset', [(0.5, 0.5), (-1.2, 0.9), (1.7, -0.4), (0.0, 2.0)])
+def test_squared_distance_matches_great_circle(app, seeded, offset):
+    latitude, longitude = LAHORE[0] + offset[0], LAHORE[1] + offset[1]
+    _, provider_id = seeded['providers'][0]
+    with app.app_context():
+        provider = db.session.get(ServiceProvider, provider_id)
+        provider.latitude, provider.longitude = latitude, longitude
+        db.session.commit()
+        squared = db.session.execute(
+            db.select(squared_distance(*LAHORE)).where(ServiceProvider.id == provider_id)
+        ).scalar()
+    assert squared ** 0.5 == pytest.approx(distance_km(*LAHORE, latitude, longitude), rel=1e-3)
@@ -0,0 +1,28 @@
+import base64
+
+import pytest
+
+from listing import PROVIDER_ORDER
+from pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def _cursor(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('raw', ['[4.5, 1e400]', '[1e400, 1]', '[NaN, 1]', '[Infinity, 1]', '["x", 1]', '[4.5]', '{}'])
+def test_malformed_cursor_is_rejected(raw):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(_cursor(raw), PROVIDER_ORDER)
+
+
+def test_cursor_round_trip():
+    class Row:
+        score, id = 4.25, 7
+    assert decode_cursor(encode_cursor(Row, PROVIDER_ORDER), PROVIDER_ORDER) == [4.25, 7]
+
+
+def test_overflowing_cursor_is_a_bad_request(seeded, client):
+    response = client.get(f"/api/services/providers?cursor={_cursor('[4.5, 1e400]')}")
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
@@ -0,0 +1,26 @@
+from werkzeug.security import generate_password_hash
+
+from passwords import PasswordHasher
+
+
+def _register(client, password):
+    return client.post('/api/auth/register', json={
+        'name': 'New', 'email': 'new@example.com', 'phone': '1', 'password': password, 'user_type': 'customer'
+    })
+
+
+def test_unhashable_passwords_are_bad_requests(client):
+    for password in ('nul\x00byte', ['not', 'a', 'string']):
+        response = _register(client, password)
+        assert response.status_code == 400
+        response = client.post('/api/auth/login', json={'email': 'new@example.com', 'password': password})
+        assert response.status_code == 400
+
+    assert _register(client, 'no nul here').status_code == 201
+
+
+def test_legacy_hash_bcrypt_cannot_take_still_verifies():
+    hasher = PasswordHasher()
+    encoded = generate_password_hash('nul\x00byte')
+    assert hasher.verify('nul\x00byte', encoded) == (True, None)
+    assert hasher.verify('nul', encoded) == (False, None)
@@ -0,0 +1,87 @@
+"""Statement counts per endpoint: a page costs the same number of queries
+however many rows it renders (see loading.py and projections.py)."""
+import pytest
+
+
+def _counts(query_count, url, sizes, **kwargs):
+    counts = []
+    for per_page in sizes:
+        response, queries = query_count(f'{url}per_page={per_page}', **kwargs)
+        assert response.status_code == 200
+        counts.append(queries)
+    return counts
+
+
+@pytest.mark.parametrize('url, limit', [
+    ('/api/services/providers?', 2),
+    ('/api/services/providers?fields=id,service_title,user.name&', 2),
+    ('/api/services/providers?category_id=1&', 2),
+    ('/api/services/providers?cursor=&', 1),
+    ('/api/services/providers/available?start=2030-01-01T10:00:00&', 2),
+])
+def test_provider_list_queries(seeded, query_count, url, limit):
+    small, large = _counts(query_count, url, (2, 12))
+    assert small == large <= limit
+
+
+def test_provider_detail_queries(seeded, query_count):
+    _, provider_id = seeded['providers'][0]
+    response, queries = query_count(f'/api/services/providers/{provider_id}')
+    assert response.status_code == 200
+    assert queries <= 2
+
+    # Served from the response cache the second time
+    response, queries = query_count(f'/api/services/providers/{provider_id}')
+    assert response.status_code == 200
+    assert queries == 0
+
+
+def test_providers_by_id_queries(seeded, query_count):
+    ids = ','.join(str(provider_id) for _, provider_id in seeded['providers'])
+    response, queries = query_count(f'/api/services/providers?ids={ids}')
+    assert response.status_code == 200
+    assert len(response.get_json()['providers']) == len(seeded['providers'])
+    assert queries <= 2
+
+
+def test_booking_list_queries(seeded, auth, query_count):
+    headers = auth(seeded['customer'])
+    query_count('/api/auth/profile', headers=headers)  # resolve the caller once
+
+    small, large = _counts(query_count, '/api/bookings/?', (2, 10), headers=headers)
+    assert small == large <= 2
+
+    small, large = _counts(query_count, '/api/bookings/?cursor=&', (2, 10), headers=headers)
+    assert small == large <= 1
+
+
+def test_booking_list_queries_for_both_roles(seeded, auth, query_count):
+    # A provider who also books as a customer gets the merged streams
+    provider_user_id, _ = seeded['providers'][0]
+    headers = auth(provider_user_id)
+    query_count('/api/auth/profile', headers=headers)
+
+    small, large = _counts(query_count, '/api/bookings/?', (1, 3), headers=headers)
+    assert small == large <= 5
+
+
+def test_booking_detail_queries(seeded, auth, query_count):
+    headers = auth(seeded['customer'])
+    query_count('/api/auth/profile', headers=headers)
+    booking_id = query_count('/api/bookings/?per_page=1', headers=headers)[0].get_json()['bookings'][0]['id']
+
+    response, queries = query_count(f'/api/bookings/{booking_id}', headers=headers)
+    assert response.status_code == 200
+    assert queries == 1
+
+
+def test_review_list_queries(seeded, query_count):
+    _, provider_id = seeded['providers'][0]
+    small, large = _counts(query_count, f'/api/reviews/provider/{provider_id}?', (1, 3))
+    assert small == large <= 2
+
+
+def test_category_list_queries(seeded, query_count):
+    response, queries = query_count('/api/services/categories')
+    assert response.status_code == 200
+    assert queries == 1
@@ -0,0 +1,54 @@
+import threading
+from datetime import datetime
+
+from extensions import db
+from models import Booking
+
+
+def _book(client, headers, provider_id, start, duration=60):
+    return client.post('/api/bookings/', json={
+        'provider_id': provider_id, 'service_date': start, 'service_duration': duration, 'service_address': 'Home'
+    }, headers=headers)
+
+
+def test_overlapping_slot_conflicts(seeded, client, auth):
+    customer = auth(seeded['customer'])
+    _, provider_id = seeded['providers'][0]
+    assert _book(client, customer, provider_id, '2027-05-01T10:00:00', 90).status_code == 201
+
+    response = _book(client, customer, provider_id, '2027-05-01T11:00:00')
+    assert response.status_code == 409
+    assert response.get_json()['error'] == 'Provider is already booked for that time'
+    # Another provider is free at the same time
+    _, other_id = seeded['providers'][1]
+    assert _book(client, customer, other_id, '2027-05-01T11:00:00').status_code == 201
+
+
+def test_adjacent_slots_are_accepted(seeded, client, auth):
+    customer = auth(seeded['customer'])
+    _, provider_id = seeded['providers'][0]
+    assert _book(client, customer, provider_id, '2027-05-01T10:00:00').status_code == 201
+    assert _book(client, customer, provider_id, '2027-05-01T11:00:00').status_code == 201
+    assert _book(client, customer, provider_id, '2027-05-01T09:00:00').status_code == 201
+
+
+def test_concurrent_creates_take_the_slot_once(app, seeded, auth):
+    customer = auth(seeded['customer'])
+    _, provider_id = seeded['providers'][0]
+    start = threading.Barrier(8)
+    statuses = []
+
+    def create():
+        client = app.test_client()
+        start.wait()
+        statuses.append(_book(client, customer, provider_id, '2027-05-01T10:00:00').status_code)
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [201] + [409] * 7
+    with app.app_context():
+        assert Booking.query.filter_by(provider_id=provider_id, service_date=datetime(2027, 5, 1, 10)).count() == 1
@@ -0,0 +1,9 @@
+def test_search_matches_words(seeded, client):
+    body = client.get('/api/services/providers?search=cook').get_json()
+    assert body['total'] == len(seeded['providers'])
+
+
+def test_search_without_words_matches_nothing(seeded, client):
+    response = client.get('/api/services/providers?search=!!!')
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 0
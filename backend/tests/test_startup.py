@@ -0,0 +1,55 @@
+"""Cold-start budget: importing app loads none of the heavy modules, and
+create_app() builds the app without connecting to the database (schema work
+is ``flask init-db``)."""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only the CLI commands, the load tests and the compression middleware need these
+HEAVY_MODULES = ('seed_data', 'benchmarks', 'brotli', 'compression')
+STARTUP_BUDGET = 2.0  # seconds, for create_app() in a fresh interpreter
+
+
+def _run(*args):
+    return subprocess.run(
+        [sys.executable, *args], cwd=BACKEND, capture_output=True, text=True, check=True
+    )
+
+
+def test_import_skips_heavy_modules():
+    result = _run('-c', (
+        'import json, sys, app; '
+        f'print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))'
+    ))
+    assert json.loads(result.stdout) == []
+
+
+def test_import_defers_models_and_blueprints():
+    result = _run('-c', (
+        'import json, sys, app; '
+        'print(json.dumps([m for m in ("models", "extensions", "routes.services", "sqlalchemy") '
+        'if m in sys.modules]))'
+    ))
+    assert json.loads(result.stdout) == []
+
+
+def test_create_app_does_not_connect():
+    # The database lives in a directory that does not exist, so any
+    # connection attempt would fail as well as being counted
+    result = _run('-c', (
+        'import json, time\n'
+        'from sqlalchemy import event\n'
+        'from sqlalchemy.engine import Engine\n'
+        'connects = []\n'
+        'event.listen(Engine, "engine_connect", lambda connection: connects.append(connection))\n'
+        'started = time.perf_counter()\n'
+        'from app import create_app\n'
+        'create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:////nonexistent/gharkakaam.db"})\n'
+        'print(json.dumps({"seconds": time.perf_counter() - started, "connects": len(connects)}))\n'
+    ))
+    startup = json.loads(result.stdout)
+    assert startup['connects'] == 0
+    assert startup['seconds'] < STARTUP_BUDGET
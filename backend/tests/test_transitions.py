@@ -0,0 +1,100 @@
+import pytest
+
+from extensions import db
+from models import Booking, BookingStatus, ServiceProvider
+
+
+def _book(client, headers, provider_id, day):
+    response = client.post('/api/bookings/', json={
+        'provider_id': provider_id, 'service_date': f'2027-04-{day:02d}T10:00:00', 'service_address': 'Home'
+    }, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['booking']
+
+
+def _counters(app, provider_id):
+    with app.app_context():
+        provider = db.session.get(ServiceProvider, provider_id)
+        return provider.total_bookings, provider.cancelled_bookings
+
+
+@pytest.fixture
+def parties(seeded, auth):
+    provider_user_id, provider_id = seeded['providers'][0]
+    return auth(seeded['customer']), auth(provider_user_id), provider_id
+
+
+def test_disallowed_transition_conflicts(client, parties):
+    customer, provider, provider_id = parties
+    booking = _book(client, customer, provider_id, 1)
+    response = client.put(f"/api/bookings/{booking['id']}/status", json={'status': 'in_progress'}, headers=provider)
+    assert response.status_code == 409
+    assert response.get_json()['error'] == 'Cannot change a pending booking to in_progress'
+
+
+def test_stale_version_conflicts(app, client, parties):
+    from transitions import BookingState, StaleBooking, transition
+
+    customer, provider, provider_id = parties
+    booking = _book(client, customer, provider_id, 1)
+    url = f"/api/bookings/{booking['id']}/status"
+    assert client.put(url, json={'status': 'confirmed', 'version': booking['version']}, headers=provider).status_code == 200
+    # A client still holding the version it read before the confirmation
+    response = client.put(url, json={'status': 'completed', 'version': booking['version']}, headers=provider)
+    assert response.status_code == 409
+
+    with app.app_context():
+        stale = BookingState(booking['id'], provider_id, BookingStatus.PENDING, booking['version'])
+        with pytest.raises(StaleBooking):
+            transition([stale], BookingStatus.CANCELLED)
+        db.session.rollback()
+        assert db.session.get(Booking, booking['id']).status == BookingStatus.CONFIRMED
+
+
+def test_counters_move_once_per_transition(app, client, parties):
+    customer, provider, provider_id = parties
+    completed, cancelled = _counters(app, provider_id)
+    first, second = _book(client, customer, provider_id, 1), _book(client, customer, provider_id, 2)
+
+    for status in ('confirmed', 'completed', 'completed'):
+        response = client.put(f"/api/bookings/{first['id']}/status", json={'status': status}, headers=provider)
+        assert response.status_code == 200
+    for _ in range(2):
+        response = client.put(f"/api/bookings/{second['id']}/status", json={'status': 'cancelled'}, headers=customer)
+        assert response.status_code == 200
+
+    assert _counters(app, provider_id) == (completed + 1, cancelled + 1)
+
+
+def test_same_status_writes_only_the_other_fields(app, client, parties):
+    customer, provider, provider_id = parties
+    booking = _book(client, customer, provider_id, 1)
+    url = f"/api/bookings/{booking['id']}/status"
+
+    response = client.put(url, json={'status': 'pending'}, headers=customer)
+    assert response.status_code == 200
+    assert response.get_json()['booking']['version'] == booking['version']
+
+    response = client.put(url, json={'status': 'pending', 'notes': 'Ring twice'}, headers=customer)
+    assert response.status_code == 200
+    assert response.get_json()['booking']['notes'] == 'Ring twice'
+    assert response.get_json()['booking']['version'] == booking['version'] + 1
+
+
+def test_batch_rejects_items_individually(app, client, parties):
+    customer, provider, provider_id = parties
+    done, pending = _book(client, customer, provider_id, 1), _book(client, customer, provider_id, 2)
+    for status in ('confirmed', 'completed'):
+        client.put(f"/api/bookings/{done['id']}/status", json={'status': status}, headers=provider)
+    completed, cancelled = _counters(app, provider_id)
+
+    response = client.post('/api/bookings/status:batch', json={
+        'ids': [done['id'], pending['id'], 999999], 'status': 'cancelled'
+    }, headers=provider)
+    assert response.status_code == 200
+    assert response.get_json() == {'updated': 1, 'results': [
+        {'id': done['id'], 'ok': False, 'error': 'Cannot change a completed booking to cancelled'},
+        {'id': pending['id'], 'ok': True},
+        {'id': 999999, 'ok': False, 'error': 'Booking not found'},
+    ]}
+    assert _counters(app, provider_id) == (completed, cancelled + 1)
@@ -0,0 +1,98 @@
+from typing import NamedTuple
+
+from sqlalchemy import func, tuple_, update
+
+from extensions import db
+from models import Booking, BookingStatus, ServiceProvider, add_missing_columns
+
+# Statuses a booking may move to from each status. Completed is final; a
+# cancelled booking may come back, subject to the slot check.
+TRANSITIONS = {
+    BookingStatus.PENDING: (BookingStatus.CONFIRMED, BookingStatus.CANCELLED),
+    BookingStatus.CONFIRMED: (BookingStatus.IN_PROGRESS, BookingStatus.COMPLETED, BookingStatus.CANCELLED),
+    BookingStatus.IN_PROGRESS: (BookingStatus.COMPLETED, BookingStatus.CANCELLED),
+    BookingStatus.COMPLETED: (),
+    BookingStatus.CANCELLED: (BookingStatus.PENDING, BookingStatus.CONFIRMED),
+}
+
+# Provider counters of the bookings in a status (see ranking.py)
+STATUS_COUNTERS = {
+    BookingStatus.COMPLETED: 'total_bookings',
+    BookingStatus.CANCELLED: 'cancelled_bookings',
+}
+
+
+class BookingState(NamedTuple):
+    # What a transition expects to find; query rows with these columns work too
+    id: int
+    provider_id: int
+    status: BookingStatus
+    version: int
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+class StaleBooking(Exception):
+    """The booking changed between reading it and writing the transition."""
+
+
+def check_transition(old, new):
+    if new not in TRANSITIONS[old]:
+        raise InvalidTransition(f'Cannot change a {old.value} booking to {new.value}')
+
+
+def transition(rows, new, **values):
+    """Move bookings to ``new`` in one conditional UPDATE, in the caller's transaction.
+
+    ``rows`` carry the ``id``, ``provider_id``, ``status`` and ``version``
+    the caller read and checked. The UPDATE only matches bookings still at
+    that status and version, so of two concurrent requests only one wins;
+    if any row no longer matches, StaleBooking is raised and the caller
+    rolls back. The provider counters move with the status, as SQL-side
+    increments in the same transaction.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    result = db.session.execute(
+        update(Booking)
+        .where(tuple_(Booking.id, Booking.status, Booking.version).in_(
+            [(row.id, row.status, row.version) for row in rows]
+        ))
+        .values(status=new, version=Booking.version + 1, **values),
+        execution_options={'synchronize_session': False}
+    )
+    if result.rowcount != len(rows):
+        raise StaleBooking('Booking was changed by another request; reload it and try again')
+
+    deltas = {}
+    for row in rows:
+        for status, step in ((row.status, -1), (new, 1)):
+            if status in STATUS_COUNTERS:
+                counters = deltas.setdefault(row.provider_id, {})
+                counters[STATUS_COUNTERS[status]] = counters.get(STATUS_COUNTERS[status], 0) + step
+
+    # One UPDATE per distinct set of deltas, e.g. every provider gaining a
+    # cancellation in a batch shares one
+    providers = {}
+    for provider_id, counters in deltas.items():
+        counters = tuple(sorted((name, step) for name, step in counters.items() if step))
+        if counters:
+            providers.setdefault(counters, []).append(provider_id)
+    for counters, provider_ids in providers.items():
+        db.session.execute(
+            update(ServiceProvider)
+            .where(ServiceProvider.id.in_(provider_ids))
+            .values({
+                name: func.coalesce(getattr(ServiceProvider, name), 0) + step
+                for name, step in counters
+            }),
+            execution_options={'synchronize_session': False}
+        )
+
+
+def install_booking_versions(connection):
+    """Add the version column to a bookings table created before it."""
+    add_missing_columns(connection, Booking.__table__, ('version',))
@@ -30,24 +30,20 @@ const Dashboard = () => {
       const bookingsResponse = await bookingsAPI.getBookings({ per_page: 10 });
       setBookings(bookingsResponse.data.bookings);
 
-      // If user is a provider, fetch their profile
+      // If user is a provider, fetch their profile and booking totals
       if (user?.user_type === 'provider') {
         try {
-          const providersResponse = await servicesAPI.getProviders({ per_page: 1 });
-          const userProvider = providersResponse.data.providers.find(p => p.user_id === user.id);
-          if (userProvider) {
-            setProviderProfile(userProvider);
-            setStats({
-              totalBookings: userProvider.total_bookings,
-              completedBookings: bookingsResponse.data.bookings.filter(b => b.status === 'completed').length,
-              totalEarnings: bookingsResponse.data.bookings
-                .filter(b => b.status === 'completed' && b.final_price)
-                .reduce((sum, b) => sum + (b.final_price || 0), 0),
-              averageRating: userProvider.rating
-            });
-          }
+          const statsResponse = await servicesAPI.getMyStats();
+          const { provider, stats: providerStats } = statsResponse.data;
+          setProviderProfile(provider);
+          setStats({
+            totalBookings: providerStats.total_bookings,
+            completedBookings: providerStats.by_status.completed,
+            totalEarnings: providerStats.earnings,
+            averageRating: provider.rating
+          });
         } catch (error) {
-          console.error('Error fetching provider profile:', error);
+          console.error('Error fetching provider stats:', error);
         }
       }
     } catch (error) {
@@ -14,7 +14,7 @@ import {
   Award
 } from 'lucide-react'
 import { servicesAPI } from '../services/api'
-import { ServiceProvider, ServiceCategory } from '../types'
+import { ServiceProvider, ServiceCategory, ProviderFacets } from '../types'
 import toast from 'react-hot-toast'
 
 const Services = () => {
@@ -23,6 +23,7 @@ const Services = () => {
   const [selectedLocation, setSelectedLocation] = useState('all')
   const [providers, setProviders] = useState<ServiceProvider[]>([])
   const [categories, setCategories] = useState<ServiceCategory[]>([])
+  const [facets, setFacets] = useState<ProviderFacets>({})
   const [isLoading, setIsLoading] = useState(true)
   const [pagination, setPagination] = useState({
     total: 0,
@@ -62,7 +63,8 @@ const Services = () => {
     try {
       setIsLoading(true)
       const params: any = {
-        per_page: 12
+        per_page: 12,
+        facets: 'category,location'
       }
 
       if (selectedCategory !== 'all') {
@@ -82,10 +84,11 @@ const Services = () => {
 
       const response = await servicesAPI.getProviders(params)
       setProviders(response.data.providers)
+      setFacets(response.data.facets ?? {})
       setPagination({
-        total: response.data.total,
-        pages: response.data.pages,
-        current_page: response.data.current_page
+        total: response.data.total ?? 0,
+        pages: response.data.pages ?? 0,
+        current_page: response.data.current_page ?? 1
       })
     } catch (error) {
       console.error('Error fetching providers:', error)
@@ -101,6 +104,15 @@ const Services = () => {
     window.open(whatsappUrl, '_blank')
   }
 
+  // Matching providers per filter option, from the facet counts
+  const locationCount = (location: string) =>
+    facets.location?.find(f => f.value === location)?.count ?? 0
+
+  const categoryCount = (optionId: string) => {
+    const category = categories.find(c => c.name.toLowerCase().includes(optionId))
+    return category ? facets.category?.find(f => f.value === category.id)?.count ?? 0 : undefined
+  }
+
   const categoryOptions = [
     { id: 'all', name: 'All Services', icon: null },
     { id: 'cooking', name: 'Home Cooking', icon: ChefHat },
@@ -147,7 +159,7 @@ const Services = () => {
               >
                 {locations.map((location) => (
                   <option key={location} value={location.toLowerCase()}>
-                    {location}
+                    {location === 'All Locations' ? location : `${location} (${locationCount(location.toLowerCase())})`}
                   </option>
                 ))}
               </select>
@@ -185,6 +197,9 @@ const Services = () => {
             >
               {category.icon && <category.icon className="h-4 w-4" />}
               <span>{category.name}</span>
+              {category.id !== 'all' && categoryCount(category.id) !== undefined && (
+                <span className="text-xs opacity-75">({categoryCount(category.id)})</span>
+              )}
             </button>
           ))}
         </div>
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { AuthResponse, User, ServiceProvider, ServiceCategory, Booking, Review, PaginatedResponse } from '../types';
+import { AuthResponse, User, ServiceProvider, ServiceCategory, Booking, Review, PaginatedResponse, PageInfo, BatchResult, ProviderStats, ProviderFacets } from '../types';
 
 const API_BASE_URL = 'http://localhost:5000/api';
 
@@ -64,10 +64,30 @@ export const servicesAPI = {
     location?: string;
     search?: string;
     min_rating?: number;
-  }) => api.get<{ providers: ServiceProvider[]; total: number; pages: number; current_page: number }>('/services/providers', { params }),
+    cursor?: string;
+    include_total?: boolean;
+    facets?: string;
+    near?: string;
+    radius_km?: number;
+  }) => api.get<{ providers: ServiceProvider[]; facets?: ProviderFacets } & PageInfo>('/services/providers', { params }),
+
+  getAvailableProviders: (params: {
+    start: string;
+    duration?: number;
+    page?: number;
+    per_page?: number;
+    category_id?: number;
+    location?: string;
+    min_rating?: number;
+    cursor?: string;
+    include_total?: boolean;
+  }) => api.get<{ providers: ServiceProvider[] } & PageInfo>('/services/providers/available', { params }),
 
   getProvider: (id: number) => api.get<{ provider: ServiceProvider }>(`/services/providers/${id}`),
 
+  getProvidersByIds: (ids: number[]) =>
+    api.get<{ providers: ServiceProvider[]; missing: number[] }>('/services/providers', { params: { ids: ids.join(',') } }),
+
   createProviderProfile: (providerData: {
     category_id: number;
     service_title: string;
@@ -79,10 +99,19 @@ export const servicesAPI = {
     price_unit?: string;
     availability?: Record<string, any>;
     service_area?: string;
+    latitude?: number;
+    longitude?: number;
+    service_radius_km?: number;
   }) => api.post<{ provider: ServiceProvider; message: string }>('/services/providers', providerData),
 
   updateProviderProfile: (id: number, providerData: Partial<ServiceProvider>) =>
     api.put<{ provider: ServiceProvider; message: string }>(`/services/providers/${id}`, providerData),
+
+  getMyStats: (params?: { days?: number }) =>
+    api.get<{ provider: ServiceProvider; stats: ProviderStats }>('/services/providers/me/stats', { params }),
+
+  approveProviders: (ids: number[]) =>
+    api.post<{ results: BatchResult[]; updated: number }>('/services/providers/approve:batch', { ids }),
 };
 
 // Bookings API
@@ -91,14 +120,21 @@ export const bookingsAPI = {
     page?: number;
     per_page?: number;
     status?: string;
-  }) => api.get<{ bookings: Booking[]; total: number; pages: number; current_page: number }>('/bookings', { params }),
+    cursor?: string;
+    include_total?: boolean;
+  }) => api.get<{ bookings: Booking[] } & PageInfo>('/bookings', { params }),
 
   getBooking: (id: number) => api.get<{ booking: Booking }>(`/bookings/${id}`),
 
+  getBookingsByIds: (ids: number[]) =>
+    api.get<{ bookings: Booking[]; missing: number[] }>('/bookings', { params: { ids: ids.join(',') } }),
+
   createBooking: (bookingData: {
     provider_id: number;
     service_date: string;
     service_address: string;
+    latitude?: number;
+    longitude?: number;
     service_duration?: number;
     special_requirements?: string;
     estimated_price?: number;
@@ -108,7 +144,19 @@ export const bookingsAPI = {
     status: string;
     notes?: string;
     final_price?: number;
+    version?: number;
   }) => api.put<{ booking: Booking; message: string }>(`/bookings/${id}/status`, statusData),
+
+  updateBookingStatuses: (ids: number[], statusData: {
+    status: string;
+    notes?: string;
+  }) => api.post<{ results: BatchResult[]; updated: number }>('/bookings/status:batch', { ids, ...statusData }),
+};
+
+// Users API
+export const usersAPI = {
+  getUsersByIds: (ids: number[]) =>
+    api.get<{ users: User[]; missing: number[] }>('/users', { params: { ids: ids.join(',') } }),
 };
 
 // Reviews API
@@ -116,7 +164,9 @@ export const reviewsAPI = {
   getProviderReviews: (providerId: number, params?: {
     page?: number;
     per_page?: number;
-  }) => api.get<{ reviews: Review[]; total: number; pages: number; current_page: number }>(`/reviews/provider/${providerId}`, { params }),
+    cursor?: string;
+    include_total?: boolean;
+  }) => api.get<{ reviews: Review[] } & PageInfo>(`/reviews/provider/${providerId}`, { params }),
 
   createReview: (reviewData: {
     booking_id: number;
@@ -33,12 +33,21 @@ export interface ServiceProvider {
   price_unit: string;
   availability: Record<string, any>;
   service_area: string;
+  latitude?: number | null;
+  longitude?: number | null;
+  service_radius_km?: number | null;
   rating: number;
   total_reviews: number;
   total_bookings: number;
+  // Listing rank: Bayesian-average rating, completion rate and recent activity
+  score: number;
   is_approved: boolean;
   is_active: boolean;
   created_at: string;
+  // Review count per star ("1".."5"); only on the provider detail response
+  rating_histogram?: Record<string, number>;
+  // Only on `near` searches
+  distance_km?: number;
 }
 
 export interface Booking {
@@ -48,10 +57,13 @@ export interface Booking {
   service_date: string;
   service_duration?: number;
   service_address: string;
+  latitude?: number | null;
+  longitude?: number | null;
   special_requirements?: string;
   estimated_price?: number;
   final_price?: number;
   status: 'pending' | 'confirmed' | 'in_progress' | 'completed' | 'cancelled';
+  version: number;
   payment_status: string;
   notes?: string;
   created_at: string;
@@ -85,4 +97,49 @@ export interface PaginatedResponse<T> {
   total: number;
   pages: number;
   current_page: number;
-}
\ No newline at end of file
+}
+
+// Offset pages carry total/pages/current_page; cursor pages (requested with
+// `cursor`) carry next_cursor/has_more and only include total on request.
+export interface PageInfo {
+  total?: number;
+  pages?: number;
+  current_page?: number;
+  next_cursor?: string | null;
+  has_more?: boolean;
+}
+
+// Per-id outcome of a batch write
+export interface BatchResult {
+  id: number;
+  ok: boolean;
+  error?: string;
+}
+
+export interface BookingStatusCounts {
+  pending: number;
+  confirmed: number;
+  in_progress: number;
+  completed: number;
+  cancelled: number;
+}
+
+// Provider dashboard figures, from the daily booking rollups
+export interface ProviderStats {
+  total_bookings: number;
+  by_status: BookingStatusCounts;
+  earnings: number;
+  daily: (BookingStatusCounts & { day: string; earnings: number })[];
+}
+
+export interface FacetCount<T = string | number> {
+  value: T;
+  count: number;
+}
+
+// Option counts for the provider filters; rating values are min_rating thresholds
+export interface ProviderFacets {
+  category?: FacetCount<number>[];
+  location?: FacetCount<string>[];
+  rating?: FacetCount<number>[];
+}